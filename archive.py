@@ -0,0 +1,166 @@
+"""
+Game archive
+Compact binary records of finished games:
+    file header: magic "GMKA", version and 3 reserved bytes
+    game header: rule name (12 bytes), board size, winner, steps count
+    moves: row * size + column of every step, 1 byte if it fits else 2
+Archives are appended by Writer and streamed by read using mmap.
+"""
+
+import mmap
+import struct
+from typing import Iterator, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+from error import GameError
+
+if TYPE_CHECKING:
+    from model import Manager
+    from rules import Rule
+
+
+MAGIC = b"GMKA"
+VERSION = 1
+FILEHEADER = struct.Struct("<4sB3x")
+GAMEHEADER = struct.Struct("<12sBBH")
+
+# Winner stored in game header
+WINNERS = {None: 0, True: 1, False: 2}
+COLORS = {value: color for color, value in WINNERS.items()}
+
+
+class ArchiveError(GameError):
+    """Invalid archive file"""
+
+
+class Record(NamedTuple):
+    """Record of one game"""
+    rule: str
+    size: int
+    winner: Optional[bool]  # Color of winner, None for draw or unfinished
+    moves: Tuple[Tuple[int, int], ...]
+
+
+def width(size: int) -> int:
+    """Return bytes of a move on board of size"""
+    return 1 if size * size <= 0x100 else 2
+
+
+class Writer:
+    """Append-only archive writer"""
+
+    def __init__(self, path: str) -> None:
+        """Open archive for appending, write file header for new file"""
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(FILEHEADER.pack(MAGIC, VERSION))
+
+    def write(self, rule: str, size: int, moves: Tuple[Tuple[int, int], ...],
+              winner: Optional[bool]) -> None:
+        """Append one game"""
+        if len(rule.encode("ascii")) > 12:
+            raise ArchiveError("Rule name {rule} too long".format(rule=rule))
+        header = GAMEHEADER.pack(rule.encode("ascii"), size,
+                                 WINNERS[winner], len(moves))
+        indexes = [row * size + column for row, column in moves]
+        packed = bytes(indexes) if width(size) == 1 else \
+            struct.pack("<{count}H".format(count=len(indexes)), *indexes)
+        self._file.write(header + packed)
+
+    def save(self, manager: "Manager", rule: "Rule") -> None:
+        """Append game of manager, winner is last player if game ended"""
+        moves = manager.records
+        winner = manager[moves[-1]] if manager.ended and moves else None
+        self.write(str(rule), manager.size, moves, winner)
+
+    def flush(self) -> None:
+        """Flush written games to disk"""
+        self._file.flush()
+
+    def close(self) -> None:
+        """Close archive"""
+        self._file.close()
+
+    def __enter__(self) -> "Writer":
+        return self
+
+    def __exit__(self, *_args) -> None:
+        self.close()
+
+
+def read(path: str) -> Iterator[Record]:
+    """Stream all games of archive without loading whole file"""
+    with open(path, "rb") as file:
+        try:
+            view = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ArchiveError("Empty archive {path}".format(path=path))
+
+        with view:
+            if len(view) < FILEHEADER.size:
+                raise ArchiveError("Invalid archive {path}".format(path=path))
+            magic, version = FILEHEADER.unpack_from(view, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ArchiveError("Invalid archive {path}".format(path=path))
+
+            offset, end = FILEHEADER.size, len(view)
+            while offset < end:
+                if offset + GAMEHEADER.size > end:
+                    raise ArchiveError("Truncated archive {path}".format(path=path))
+                name, size, winner, steps = GAMEHEADER.unpack_from(view, offset)
+                offset += GAMEHEADER.size
+                length = steps * width(size)
+                if offset + length > end:
+                    raise ArchiveError("Truncated archive {path}".format(path=path))
+                if width(size) == 1:
+                    indexes: Tuple[int, ...] = tuple(view[offset:offset + length])
+                else:
+                    indexes = struct.unpack_from(
+                        "<{count}H".format(count=steps), view, offset)
+                offset += length
+                yield Record(name.rstrip(b"\0").decode("ascii"), size,
+                             COLORS[winner],
+                             tuple(divmod(index, size) for index in indexes))
+
+
+if __name__ == "__main__":
+
+    import os
+    import tempfile
+    from model import Manager
+    from rules import Standard
+
+    path = os.path.join(tempfile.mkdtemp(), "games.gmka")
+
+    # Test writing, appending and streaming games
+    manager = Manager(15)
+    for column in range(5):
+        manager[7, column] = True
+        if column < 4:
+            manager[8, column] = False
+    manager.end()
+    with Writer(path) as writer:
+        writer.save(manager, Standard())
+        writer.write("FreeStyle", 19, ((18, 18), (0, 0), (9, 9)), None)
+    with Writer(path) as writer:
+        writer.write("Pro", 15, (), False)
+
+    records = list(read(path))
+    assert(records[0] == Record("Standard", 15, True, manager.records))
+    assert(records[1] == Record("FreeStyle", 19, None, ((18, 18), (0, 0), (9, 9))))
+    assert(records[2] == Record("Pro", 15, False, ()))
+    assert(os.path.getsize(path) == FILEHEADER.size + GAMEHEADER.size * 3 + 9 + 6)
+
+    # Test files cut inside a game header, its moves or the file header
+    with open(path, "rb") as file:
+        data = file.read()
+    for length in (FILEHEADER.size + GAMEHEADER.size - 1,
+                   FILEHEADER.size + GAMEHEADER.size + 1, 2):
+        with open(path, "wb") as file:
+            file.write(data[:length])
+        try:
+            list(read(path))
+        except ArchiveError:
+            pass
+        else:
+            assert(False)
+    os.remove(path)
@@ -0,0 +1,228 @@
+"""
+Benchmarks of engine hot paths
+Run all benchmarks and print results as JSON:
+    python bench.py [--output FILE] [--compare FILE] [--filter TEXT]
+Every result records seconds per operation (best of repeats)
+so results of different commits can be compared.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+from argparse import ArgumentParser
+from random import Random
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from rules import Rule, Standard
+from error import GameWon, RuleException
+from model import Manager
+from controller import HeadlessGame
+from player import RandomPlayer
+
+# Benchmark takes a setup and returns the function to time
+Benchmark = Callable[[], Callable[[], object]]
+BENCHMARKS: Dict[str, Benchmark] = dict()
+
+
+def benchmark(name: str) -> Callable[[Benchmark], Benchmark]:
+    """Register a benchmark"""
+    def register(function: Benchmark) -> Benchmark:
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def _filled(manager: Manager, count: int, seed: int = 15) -> List[Tuple[int, int]]:
+    """Fill count random grids alternately, return them in order"""
+    grids = [(row, column) for row in range(manager.size)
+             for column in range(manager.size)]
+    Random(seed).shuffle(grids)
+    for grid in grids[:count]:
+        manager[grid] = manager.turn
+    return grids
+
+
+@benchmark("import.game")
+def _import() -> Callable[[], object]:
+    command = [sys.executable, "-c", "import controller, rules, model, error"]
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    # Fresh interpreter every run, its startup is part of the cost
+    return lambda: subprocess.run(command, cwd=directory, check=True)
+
+
+@benchmark("Manager.setitem")
+def _setitem() -> Callable[[], object]:
+    manager = Manager(15)
+    grids = _filled(Manager(15), 0)[:100]
+
+    def run() -> None:
+        for grid in grids:
+            manager[grid] = True
+        manager.reset()
+    return run
+
+
+@benchmark("Manager.getitem")
+def _getitem() -> Callable[[], object]:
+    manager = Manager(15)
+    grids = _filled(manager, 100)[:200]
+    return lambda: [manager[grid] for grid in grids]
+
+
+for _density, _count in (("sparse", 20), ("dense", 150)):
+
+    @benchmark("Manager.find.{density}".format(density=_density))
+    def _find(count: int = _count) -> Callable[[], object]:
+        manager = Manager(15)
+        grids = _filled(manager, count)[:count]
+        return lambda: [manager.find(*grid) for grid in grids]
+
+
+for _rule in Rule.rules():
+
+    @benchmark("rule.{name}".format(name=_rule.__name__))
+    def _call(kind: Type[Rule] = _rule) -> Callable[[], object]:
+        rule, manager = kind.create(15), Manager(15)
+        grids = _filled(manager, 40)[:40]
+
+        # Odd steps after the opening, situation is part of the cost
+        def run() -> None:
+            for row, column in grids:
+                try:
+                    rule((row, column), 11, rule.situation(manager, row, column))
+                except (GameWon, RuleException):
+                    pass
+        return run
+
+
+@benchmark("game.random")
+def _random() -> Callable[[], object]:
+    seeds = iter(range(1 << 30))
+
+    def run() -> None:
+        rule = Standard()
+        game = HeadlessGame(15, {True: "Black", False: "White"}, rule)
+        for color in (True, False):
+            game.join(RandomPlayer(str(color), color, game.manager, rule,
+                                   seed=next(seeds)))
+        game.start()
+        while (position := game.player.event) is not None:
+            if not game.play(*position):
+                break
+    return run
+
+
+@benchmark("mcts.playout")
+def _playout() -> Callable[[], object]:
+    import numpy
+    from core.mcts import MCTS
+    from core.vector import VectorGame
+    rule = Standard()
+    search, games = MCTS(rule, seed=15), VectorGame(256, 15, rule)
+    boards = numpy.zeros((256, 15, 15), dtype=numpy.int8)
+    boards[:, 7, 7] = 1
+    steps = numpy.ones(256, dtype=numpy.int32)
+    return lambda: search._playout(games, boards, steps)
+
+
+@benchmark("view.draw")
+def _draw() -> Callable[[], object]:
+    import tkinter
+    from view import Board
+    root = tkinter.Tk()
+    board = Board(root, 600, 19)
+
+    # Board draws once, its grid is cleared for every run to draw again
+    def run() -> None:
+        board._board.delete(Board.GRIDTAG)
+        board._drawn = False
+        board.draw()
+        root.update()
+    return run
+
+
+def measure(benchmark: Benchmark, repeat: int = 3) -> float:
+    """Return best seconds of one run"""
+    timer = timeit.Timer(benchmark())
+    number, _elapsed = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def revision() -> Optional[str]:
+    """Return current git commit if available"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _unavailable() -> Tuple[Type[Exception], ...]:
+    """Return errors of missing modules or display, other errors are failures"""
+    try:
+        import tkinter
+    except ImportError:
+        return (ImportError,)
+    return (ImportError, tkinter.TclError)
+
+
+def run(pattern: str = "", repeat: int = 3) -> Dict[str, object]:
+    """Run benchmarks with name containing pattern, skip unavailable ones"""
+    results: Dict[str, float] = dict()
+    skipped: Dict[str, str] = dict()
+    unavailable = _unavailable()
+    for name, function in BENCHMARKS.items():
+        if pattern not in name:
+            continue
+        try:
+            results[name] = measure(function, repeat)
+        except unavailable as error:  # Such as no display for view
+            skipped[name] = "{kind}: {error}".format(
+                kind=type(error).__name__, error=error)
+    return {
+        "revision": revision(),
+        "python": platform.python_version(),
+        "results": results,  # Seconds of one run
+        "skipped": skipped,
+    }
+
+
+def compare(old: Dict[str, object], new: Dict[str, object]) -> str:
+    """Return lines of speed changes between two reports"""
+    lines: List[str] = list()
+    before, after = old["results"], new["results"]
+    assert isinstance(before, dict) and isinstance(after, dict)
+    for name in sorted(set(before) & set(after)):
+        lines.append("{name}: {old:.3e}s -> {new:.3e}s ({change:+.1%})".format(
+            name=name, old=before[name], new=after[name],
+            change=after[name] / before[name] - 1))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser(description="Gomoku engine benchmarks")
+    parser.add_argument("--output", default=None,
+                        help="write JSON report to this file")
+    parser.add_argument("--compare", default=None,
+                        help="print changes against an older JSON report")
+    parser.add_argument("--filter", default="",
+                        help="only run benchmarks containing this text")
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments = parser.parse_args()
+
+    report = run(arguments.filter, arguments.repeat)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if arguments.output is None:
+        print(text)
+    else:
+        with open(arguments.output, "w") as file:
+            file.write(text + "\n")
+    if arguments.compare is not None:
+        with open(arguments.compare) as file:
+            print(compare(json.load(file), report), file=sys.stderr)
@@ -0,0 +1,192 @@
+"""
+Opening book
+Sorted fixed-size records of position key, move and statistics:
+    file header: magic "GMKB", version, board size
+    record: key (8 bytes), move (2 bytes), games (4 bytes), wins (4 bytes)
+Positions are keyed by canonical hash and moves are stored on the
+canonical board, so symmetric openings share records.
+Books are built from archives and searched in place through mmap.
+"""
+
+import mmap
+import struct
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+from model import Manager
+from archive import ArchiveError, Record
+from core.search import legal
+from core.symmetry import apply, canonical, hashes, inverse
+
+if TYPE_CHECKING:
+    from rules import Rule
+
+
+MAGIC = b"GMKB"
+VERSION = 2
+FILEHEADER = struct.Struct("<4sBB2x")
+RECORD = struct.Struct("<QHII")
+
+
+class Entry(NamedTuple):
+    """Statistics of a move from a position"""
+    move: Tuple[int, int]
+    games: int
+    wins: int  # Games won by the player of this move
+
+
+def build(path: str, records: Iterable[Record], size: int,
+          plies: int = 12, rule: Optional[str] = None) -> int:
+    """
+    Build book of first plies moves of archived games on board of size,
+    only games of rule if given. Return number of records written.
+    """
+    stats: Dict[Tuple[int, int], List[int]] = defaultdict(lambda: [0, 0])
+    for record in records:
+        if record.size != size or (rule is not None and record.rule != rule):
+            continue
+        manager = Manager(size)
+        for row, column in record.moves[:plies]:
+            color = manager.turn
+            entry = stats[_canonical(manager, row, column)]
+            entry[0] += 1
+            entry[1] += record.winner is color
+            manager[row, column] = color
+
+    with open(path, "wb") as file:
+        file.write(FILEHEADER.pack(MAGIC, VERSION, size))
+        for (key, move), (games, wins) in sorted(stats.items()):
+            file.write(RECORD.pack(key, move, games, wins))
+    return len(stats)
+
+
+def _canonical(manager: Manager, row: int, column: int) -> Tuple[int, int]:
+    """
+    Return canonical key of position and index of move on canonical board,
+    least index if several transforms give the canonical position
+    """
+    values = hashes(manager)
+    key, size = min(values), manager.size
+    move = min(mrow * size + mcolumn for mrow, mcolumn in
+               (apply(transform, row, column, size)
+                for transform, value in enumerate(values) if value == key))
+    return key, move
+
+
+class Book:
+    """Opening book searched by binary search over mmap"""
+
+    def __init__(self, path: str) -> None:
+        """Map book file"""
+        with open(path, "rb") as file:
+            self._view = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._size = FILEHEADER.unpack_from(self._view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ArchiveError("Invalid book {path}".format(path=path))
+        self._count = (len(self._view) - FILEHEADER.size) // RECORD.size
+
+    @property
+    def size(self) -> int:
+        """Return board size of book"""
+        return self._size
+
+    def __len__(self) -> int:
+        """Return records count"""
+        return self._count
+
+    def close(self) -> None:
+        """Unmap book file"""
+        self._view.close()
+
+    def _key(self, index: int) -> int:
+        """Return key of record at index"""
+        return struct.unpack_from(
+            "<Q", self._view, FILEHEADER.size + index * RECORD.size)[0]
+
+    def lookup(self, key: int) -> List[Entry]:
+        """Return all moves of position key"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        entries: List[Entry] = list()
+        for index in range(low, self._count):
+            rkey, move, games, wins = RECORD.unpack_from(
+                self._view, FILEHEADER.size + index * RECORD.size)
+            if rkey != key:
+                break
+            entries.append(Entry(divmod(move, self._size), games, wins))
+        return entries
+
+    def probe(self, manager: Manager, rule: "Rule", color: bool,
+              least: int = 2) -> Optional[Tuple[int, int]]:
+        """
+        Return book move of highest win rate played at least least times,
+        moves not allowed by rule (such as opening constraints) are skipped
+        """
+        if manager.size != self._size:
+            return None
+        key, transform = canonical(manager)
+        back = inverse(transform)
+        entries = [entry._replace(move=apply(back, *entry.move, self._size))
+                   for entry in self.lookup(key) if entry.games >= least]
+        entries = [entry for entry in entries
+                   if legal(manager, rule, *entry.move, color)]
+        if not entries:
+            return None
+        best = max(entries, key=lambda entry: (entry.wins / entry.games,
+                                               entry.games))
+        return best.move
+
+
+if __name__ == "__main__":
+
+    import os
+    import tempfile
+    from rules import Pro, Standard
+
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "opening.gmkb")
+
+    # Build book from games opening with centre
+    records = [
+        Record("Pro", 15, True, ((7, 7), (7, 8), (2, 2), (8, 8))),
+        Record("Pro", 15, False, ((7, 7), (7, 8), (2, 2), (6, 6))),
+        Record("Pro", 15, True, ((7, 7), (7, 8), (7, 6))),
+        Record("Pro", 15, True, ((7, 7), (7, 8), (7, 6))),
+        Record("Pro", 15, False, ((7, 7), (8, 8))),
+        Record("Pro", 19, True, ((9, 9),)),
+    ]
+    assert(build(path, records, 15, plies=3) == 5)
+    book = Book(path)
+    assert(len(book) == 5 and book.size == 15)
+
+    # Test lookup and probing
+    manager = Manager(15)
+    assert(book.lookup(canonical(manager)[0]) == [Entry((7, 7), 5, 3)])
+    assert(book.probe(manager, Pro(15), True) == (7, 7))
+    manager[7, 7] = True
+    # Adjacent second moves are symmetric, any of them is returned
+    assert(book.probe(manager, Pro(15), False) in
+           {(6, 7), (7, 6), (7, 8), (8, 7)})
+    manager[7, 8] = False
+
+    # Third move (7, 6) wins more but Gomoku Pro forbids it
+    assert(book.probe(manager, Standard(), True) == (7, 6))
+    assert(book.probe(manager, Pro(15), True) in {(2, 2), (12, 2)})
+    assert(manager.steps == 2)
+    manager[0, 0] = True
+    assert(book.probe(manager, Pro(15), False) is None)
+
+    # Rotated openings share records and map back to the board
+    rotated = Manager(15)
+    rotated[7, 7] = True
+    rotated[8, 7] = False
+    assert(book.probe(rotated, Standard(), True) == (6, 7))
+    assert(book.probe(rotated, Pro(15), True) in {(2, 2), (2, 12)})
+    book.close()
+    os.remove(path)
@@ -2,19 +2,43 @@
 Game mode - controller:
     Game - Abstract Game Class
     SingleGame - LocalSingleGame
+    HeadlessGame - Game without any UI
+    Outcome - Outcome of a game event
 """
 
-import tkinter
 from abc import abstractmethod
+from enum import Enum
 from threading import Thread
-from typing import Callable, Dict, Tuple
+from typing import Callable, Dict, Optional, Tuple, TYPE_CHECKING
 
 from rules import Rule
 from model import Manager
-from player import LocalPlayer, Player
-from view import Board
+from player import HeadlessPlayer, LocalPlayer, Player
 from error import InvalidGridError, SwapRequest, GameEnded, RuleException, GameWon, InvalidPosition, SettedGridError
 
+if TYPE_CHECKING:
+    from instrument import Instruments
+
+
+def _ignore(_event: object) -> None:
+    """Instrumentation hook of games without instruments"""
+
+
+class Outcome(Enum):
+    """Outcome of a game event"""
+    PLAYED = "played"
+    WON = "won"
+    INVALID = "invalid"
+    SWAP = "swap"  # Swap requested, game waits for the selection
+    ENDED = "ended"  # Game has already ended
+    UNDONE = "undone"
+    RESTARTED = "restarted"
+
+    @property
+    def over(self) -> bool:
+        """Return if game is over after this event"""
+        return self in (Outcome.WON, Outcome.ENDED)
+
 
 class Game:
     """Gaming Abstract model"""
@@ -22,7 +46,6 @@ class Game:
     def __init__(self, grids: int, size: int,
                  players: Dict[bool, str], rule: Rule) -> None:
         """Initial a new Game"""
-        self._tkroot = tkinter.Tk()
         self._game = Manager(grids)
         self._size, self._grids = size, grids
 
@@ -31,11 +54,39 @@ class Game:
         self._players: Dict[bool, Player] = dict()
         self._rule = rule
 
+        # Instrumentation hooks marking phases and outcome of moves
+        self._mark: Callable[[str], None] = _ignore
+        self._finish: Callable[[Outcome], None] = _ignore
+
     @property
     def player(self) -> Player:
         """Return current player"""
         return self._curplayer
 
+    @property
+    def manager(self) -> Manager:
+        """Return game data manager"""
+        return self._game
+
+    @property
+    def rule(self) -> Rule:
+        """Return game rule"""
+        return self._rule
+
+    def instrument(self, instruments: Optional["Instruments"]) -> None:
+        """Time phases of every move with instruments, None to stop"""
+        if instruments is None:
+            self._mark, self._finish = _ignore, _ignore
+        else:
+            self._mark, self._finish = instruments.mark, instruments.finish
+
+    def join(self, player: Player) -> None:
+        """Seat a player with its color, replacing the old one"""
+        color = bool(player)
+        if getattr(self, "_curplayer", None) is self._players.get(color):
+            self._curplayer = player
+        self._players[color] = player
+
     def toggle(self) -> None:
         """Toggle game player"""
         self._curplayer = self._players[not bool(self._curplayer)]
@@ -55,11 +106,16 @@ class Game:
         # Play piece for looking winner
         # If rule said is invalid, cancel this operation
         self._game[row, column] = bool(self.player)
-        situation = self._game.find(row, column)
+        self._mark("write")
+        situation = self._rule.situation(self._game, row, column)
+        self._mark("find")
 
         # Check rule
         try:
-            self._rule((row, column), self._game.steps, situation)
+            try:
+                self._rule((row, column), self._game.steps, situation)
+            finally:
+                self._mark("rule")
         except GameWon as error:
             self._game.end()
             raise
@@ -70,48 +126,89 @@ class Game:
         except SwapRequest as error:
             raise
 
-    def restart(self) -> None:
-        """Restart handler function"""
+    def _wake(self, player: Player) -> None:
+        """
+        Wake a gaming loop waiting for events of player,
+        event-driven games have no loop to wake
+        """
+
+    def submit_move(self, row: int, column: int) -> Outcome:
+        """Handle one position of current player without blocking"""
+        self._mark("")
+        try:
+            self.click(row, column)
+        except GameEnded:
+            outcome = Outcome.ENDED
+        except (SettedGridError, InvalidGridError):
+            outcome = Outcome.INVALID
+
+        except GameWon as error:
+            self._mark("handle")
+            self.player.play(row, column)
+            self._mark("play")
+            self.player.win(error.pieces)
+            outcome = Outcome.WON
+
+        # When player swapping dont change
+        except SwapRequest as request:
+            self._mark("handle")
+            self.player.play(row, column)
+            self._mark("play")
+            self.swap(request, {
+                True: self.player.active,  # If swapped dont toggle
+                False: self.toggle   # If not swapped toggle
+            })
+            outcome = Outcome.SWAP
+
+        # For General Rule check exception dont play piece
+        except RuleException as _error:
+            outcome = Outcome.INVALID
+
+        else:
+            self.player.play(row, column)
+            self._mark("play")
+            self.toggle()
+            self._mark("toggle")
+            outcome = Outcome.PLAYED
+
+        if outcome is Outcome.INVALID or outcome is Outcome.ENDED:
+            self._mark("handle")
+        self._finish(outcome)
+        return outcome
+
+    def undo(self) -> Outcome:
+        """Undo the last step and give turn back"""
+        if self._game.ended:
+            return Outcome.ENDED
+        if not self._game.steps:
+            return Outcome.INVALID
+        row, column = self._game.undo()
+
+        # Move already sent by player losing the turn is dropped
+        previous = self.player
+        previous.cancel()
+        previous.undo(row, column)
+        self.toggle()
+        self._wake(previous)
+        return Outcome.UNDONE
+
+    def restart(self) -> Outcome:
+        """Reset game and give turn to sente player"""
         self._game.reset()
-        oldplayer = self._curplayer
+        previous = self._curplayer
+        previous.cancel()
         self._curplayer = self._players[True]
-        oldplayer.handler(-1, -1)
+        self._wake(previous)
         self.player.active()
+        return Outcome.RESTARTED
 
     def gaming(self) -> None:
         """Game logistic"""
         while position := self.player.event:
-
+            self._mark("wait")
             row, column = position
-            try:
-                self.click(row, column)
-            except GameEnded:
+            if self.submit_move(row, column).over:
                 break
-            except SettedGridError:
-                continue
-            except InvalidGridError:
-                continue
-
-            except GameWon as error:
-                self.player.play(row, column)
-                self.player.win(error.pieces)
-                break
-
-            # When player swapping dont change
-            except SwapRequest as request:
-                self.player.play(row, column)
-                self.swap(request, {
-                    True: self.player.active,  # If swapped dont toggle
-                    False: self.toggle   # If not swapped toggle
-                })
-                continue
-
-            # For General Rule check exception dont play piece
-            except RuleException as _error:
-                continue
-
-            self.player.play(row, column)
-            self.toggle()
 
         # Restore resources
         ...
@@ -131,6 +228,9 @@ class LocalGame(Game):
         super().__init__(grids, size, players, rule)
 
         # Initialize tkUI
+        import tkinter
+        from view import Board
+        self._tkroot = tkinter.Tk()
         self._board = Board(self._tkroot, self._size, self._grids)
         self._board.click = self.click
         self._board.restart = self.restart
@@ -140,12 +240,9 @@ class LocalGame(Game):
         for color, name in players.items():
             self._players[color] = LocalPlayer(name, color, self._board)
 
-    def undo(self) -> Tuple[int, int]:
-        """Undo last step"""
-        x, y = self._game.undo()
-        self.player.handler(-1, -1)
-        self.toggle()
-        return x, y
+    def _wake(self, player: Player) -> None:
+        """Wake gaming thread by an invalid position"""
+        player.handler(-1, -1)
 
     def swap(self, request: SwapRequest, callbacks: Dict[bool, Callable]) -> None:
         """Swap handler for Local Game using tkinter"""
@@ -175,3 +272,121 @@ class LocalGame(Game):
 
         # Mainloop
         self._tkroot.mainloop()
+
+
+class HeadlessGame(Game):
+    """Game without UI, positions are played synchronously"""
+
+    def __init__(self, grids: int, players: Dict[bool, str], rule: Rule,
+                 swapper: Optional[Callable[[SwapRequest], Tuple[str, ...]]] = None
+                 ) -> None:
+        """
+        Initialize a new headless game:
+            swapper: choose option of a swap request,
+                     the last option (never swap) is chosen by default
+        """
+        super().__init__(grids, 0, players, rule)
+        self._swapper = swapper
+        for color, name in players.items():
+            self._players[color] = HeadlessPlayer(name, color)
+
+        # Bind sente player only, start or run activates it once
+        self._curplayer = self._players[True]
+
+    def play(self, row: int, column: int) -> bool:
+        """Play a position for current player, return if game goes on"""
+        return not self.submit_move(row, column).over
+
+    def run(self) -> None:
+        """Play until game ends by events of players like SearchPlayer"""
+        self.start()
+        self.gaming()
+
+    def swap(self, request: SwapRequest, callbacks: Dict[bool, Callable]) -> None:
+        """Swap handler choosing option by swapper"""
+        options = request.options
+        if self._swapper is None:
+            key = list(options)[-1]
+        else:
+            key = self._swapper(request)
+        callback = callbacks.get(options[key](self._players), None)
+        if callable(callback):
+            callback()
+
+    def start(self) -> None:
+        """Bind sente player"""
+        self._curplayer = self._players[True]
+        self.player.active()
+
+
+if __name__ == "__main__":
+
+    from rules import Standard, Swap
+
+    # Test outcomes of events driven without a gaming loop
+    game = HeadlessGame(9, {True: "Doge", False: "Meow"}, Standard())
+    assert(game.undo() is Outcome.INVALID)
+    assert(game.submit_move(4, 4) is Outcome.PLAYED)
+    assert(game.submit_move(4, 4) is Outcome.INVALID)
+    assert(game.undo() is Outcome.UNDONE and bool(game.player))
+    for column in range(4):
+        assert(game.submit_move(0, column) is Outcome.PLAYED)
+        assert(game.submit_move(1, column) is Outcome.PLAYED)
+    assert(game.submit_move(0, 4) is Outcome.WON)
+    assert(game.submit_move(5, 5) is Outcome.ENDED and game.undo().over)
+    assert(game.restart() is Outcome.RESTARTED and game.manager.steps == 0)
+
+    # Test run activates a joined player exactly once for the first move
+    class Counting(HeadlessPlayer):
+        """Player counting activations, leaving at the first one"""
+
+        def __init__(self, name: str, color: bool) -> None:
+            super().__init__(name, color)
+            self.activations = 0
+
+        def active(self) -> None:
+            self.activations += 1
+            self.leave()
+
+    game = HeadlessGame(9, {True: "Doge", False: "Meow"}, Standard())
+    counting = Counting("Doge", True)
+    game.join(counting)
+    game.run()
+    assert(counting.activations == 1)
+
+    # Test undo and restart drop moves sent by automated players
+    from player import RandomPlayer
+    game = HeadlessGame(9, {True: "Doge", False: "Meow"}, Standard())
+    for color in (True, False):
+        game.join(RandomPlayer(str(color), color, game.manager,
+                               game.rule, seed=int(color)))
+    game.start()
+    assert(game.submit_move(*game.player.event) is Outcome.PLAYED)
+    assert(game.undo() is Outcome.UNDONE and bool(game.player))
+    assert(game.submit_move(*game.player.event) is Outcome.PLAYED)
+    assert(game.restart() is Outcome.RESTARTED and bool(game.player))
+    assert(game.submit_move(*game.player.event) is Outcome.PLAYED)
+    assert(game.submit_move(*game.player.event) is Outcome.PLAYED)
+
+    # Test swap requested at third step
+    game = HeadlessGame(9, {True: "Doge", False: "Meow"}, Swap())
+    outcomes = [game.submit_move(0, column) for column in range(3)]
+    assert(outcomes[-1] is Outcome.SWAP and not bool(game.player))
+
+    # Test game logic imports without UI or network modules,
+    # import time is only reported since it depends on the machine
+    import os
+    import subprocess
+    import sys
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import controller, rules, model, error\n"
+        "print(time.perf_counter() - start)\n"
+        "print(sorted({'tkinter', 'view', 'asyncio', 'numpy'} & set(sys.modules)))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True).stdout.split("\n")
+    assert(output[1] == "[]")
+    print("Game logic imported in {seconds:.3f}s".format(seconds=float(output[0])))
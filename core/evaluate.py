@@ -0,0 +1,191 @@
+"""
+Pattern evaluator
+Count line patterns (fives, fours, threes and twos) of both colors
+and keep the counts up to date incrementally while grids change.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Set, Tuple, Union, TYPE_CHECKING
+
+from model import DIRECTIONS
+
+if TYPE_CHECKING:
+    from model import Manager
+
+
+# Pattern categories
+FIVE, OPEN_FOUR, FOUR, OPEN_THREE, THREE, OPEN_TWO, TWO = range(7)
+WEIGHTS = (1000000, 100000, 1000, 1000, 100, 100, 10)  # Score of categories
+
+# Shapes of categories, strongest first:
+# x - own piece, . - unset grid, anything else is blocked
+SHAPES: Tuple[Tuple[int, Tuple[str, ...]], ...] = (
+    (FIVE, ("xxxxx",)),
+    (OPEN_FOUR, (".xxxx.",)),
+    (FOUR, ("xxxx.", ".xxxx", "xxx.x", "x.xxx", "xx.xx")),
+    (OPEN_THREE, (".xxx..", "..xxx.", ".xx.x.", ".x.xx.")),
+    (THREE, ("xxx..", "..xxx", ".xxx.", "xx.x.", ".x.xx", "x.xx.",
+             ".xx.x", "xx..x", "x..xx", "x.x.x")),
+    (OPEN_TWO, ("..xx..", ".x.x.", ".x..x.")),
+    (TWO, ("xx...", "...xx", ".xx..", "..xx.", "x.x..", "..x.x",
+           "x..x.", ".x..x", "x...x")),
+)
+
+# Characters of grid status in line strings
+CHARS: Dict[Union[None, bool], str] = {None: ".", True: "x", False: "o"}
+
+
+@lru_cache(maxsize=None)
+def lines(size: int) -> Tuple[Tuple[Tuple[int, int], ...], ...]:
+    """Return all lines longer than 5 grids of a board"""
+    result: List[Tuple[Tuple[int, int], ...]] = list()
+    for drow, dcolumn in DIRECTIONS.values():
+        for row in range(size):
+            for column in range(size):
+
+                # Only start from the first grid of every line
+                prow, pcolumn = row - drow, column - dcolumn
+                if 0 <= prow < size and 0 <= pcolumn < size:
+                    continue
+                line: List[Tuple[int, int]] = list()
+                nrow, ncolumn = row, column
+                while 0 <= nrow < size and 0 <= ncolumn < size:
+                    line.append((nrow, ncolumn))
+                    nrow, ncolumn = nrow + drow, ncolumn + dcolumn
+                if len(line) >= 5:
+                    result.append(tuple(line))
+    return tuple(result)
+
+
+@lru_cache(maxsize=None)
+def count(line: str) -> Tuple[int, ...]:
+    """
+    Return pattern counts of "x" pieces in a line string,
+    shapes are skipped if all their pieces are used by stronger ones
+    or any of their pieces is used by the same category
+    """
+    line = "#" + line + "#"
+    counts = [0] * len(SHAPES)
+    used: Set[int] = set()
+    for category, shapes in SHAPES:
+        same: Set[int] = set()
+        for shape in shapes:
+            start = line.find(shape)
+            while start != -1:
+                pieces = {start + index
+                          for index, char in enumerate(shape) if char == "x"}
+                if not pieces <= used and not pieces & same:
+                    counts[category] += 1
+                    same |= pieces
+                start = line.find(shape, start + 1)
+        used |= same
+    return tuple(counts)
+
+
+@lru_cache(maxsize=None)
+def classify(line: str) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """Return pattern counts of a line string for (True, False) pieces"""
+    black = count(line.replace("o", "#"))
+    white = count(line.replace("x", "#").replace("o", "x"))
+    return black, white
+
+
+class Evaluator:
+    """Pattern counts of a manager updated on every grid change"""
+
+    def __init__(self, manager: "Manager") -> None:
+        """Count all lines of manager and watch its changes"""
+        self._manager = manager
+        self._lines = lines(manager.size)
+
+        # Lines and index in line of every grid
+        self._grids: Dict[Tuple[int, int], List[Tuple[int, int]]] = dict()
+        for number, line in enumerate(self._lines):
+            for index, grid in enumerate(line):
+                self._grids.setdefault(grid, list()).append((number, index))
+
+        self._chars: List[List[str]] = list()
+        self._counts: Dict[bool, List[int]] = dict()
+        self.recount()
+        manager.watch(self.update)
+
+    def close(self) -> None:
+        """Stop watching manager"""
+        self._manager.unwatch(self.update)
+
+    def recount(self) -> None:
+        """Count all lines from scratch"""
+        self._chars = [[CHARS[self._manager[grid]] for grid in line]
+                       for line in self._lines]
+        self._counts = {True: [0] * len(SHAPES), False: [0] * len(SHAPES)}
+        for chars in self._chars:
+            self._add(classify("".join(chars)), 1)
+
+    def _add(self, counts: Tuple[Tuple[int, ...], Tuple[int, ...]],
+             sign: int) -> None:
+        """Add (or subtract) pattern counts of a line"""
+        for color, values in zip((True, False), counts):
+            total = self._counts[color]
+            for category, value in enumerate(values):
+                if value:
+                    total[category] += value * sign
+
+    def update(self, row: int, column: int, value: Union[None, bool]) -> None:
+        """Recount only the lines through a changed grid"""
+        if row < 0:
+            self.recount()
+            return
+        char = CHARS[value]
+        for number, index in self._grids.get((row, column), ()):
+            chars = self._chars[number]
+            self._add(classify("".join(chars)), -1)
+            chars[index] = char
+            self._add(classify("".join(chars)), 1)
+
+    def counts(self, color: bool) -> Tuple[int, ...]:
+        """Return pattern counts of color"""
+        return tuple(self._counts[color])
+
+    def score(self, color: bool) -> int:
+        """Return weighted pattern counts of color minus the opponent"""
+        own, opponent = self._counts[color], self._counts[not color]
+        return sum(weight * (mine - other) for weight, mine, other
+                   in zip(WEIGHTS, own, opponent))
+
+
+if __name__ == "__main__":
+
+    from model import Manager
+
+    # Test shapes counting
+    assert(count("..xxxx..")[OPEN_FOUR] == 1)
+    assert(count("..xxxx..")[FOUR] == 0)
+    assert(count("#xxxx...")[FOUR] == 1)
+    assert(count("..xxx...")[OPEN_THREE] == 1)
+    assert(count("xxxxxx")[FIVE] == 1)
+    assert(classify("x.o.xx..")[0][OPEN_TWO] == 0)
+    assert(classify("....oo....")[1][OPEN_TWO] == 1)
+
+    # Test incremental counts against recounting
+    import random
+    random.seed(15)
+    manager = Manager(15)
+    evaluator = Evaluator(manager)
+    grids = [(row, column) for row in range(15) for column in range(15)]
+    random.shuffle(grids)
+    for row, column in grids[:80]:
+        manager[row, column] = manager.turn
+    for _index in range(20):
+        manager.undo()
+    manager[grids[0]] = None
+    counts = evaluator.counts(True), evaluator.counts(False)
+    evaluator.recount()
+    assert(counts == (evaluator.counts(True), evaluator.counts(False)))
+    assert(evaluator.score(True) == -evaluator.score(False))
+
+    # Test reset and closing
+    manager.reset()
+    assert(evaluator.score(True) == 0 and sum(evaluator.counts(False)) == 0)
+    evaluator.close()
+    manager[7, 7] = True
+    assert(sum(evaluator.counts(True)) == 0)
@@ -0,0 +1,361 @@
+"""
+Monte Carlo tree search
+UCT over a tree kept in flat NumPy arrays, children of a node are
+stored next to each other. Every batch selects many leaves, counting
+playouts in flight as losses so selections spread out, and values them
+by a few random playouts each, all advanced together in a VectorGame,
+so win checks follow the overline semantics of the rule.
+"""
+
+import numpy
+from functools import lru_cache
+from math import log, sqrt
+from time import perf_counter
+from typing import Optional, Tuple, TYPE_CHECKING
+
+from model import Candidates
+from core.search import Report, legal, priority
+from core.vector import BLACK, EMPTY, WHITE, VectorGame
+
+if TYPE_CHECKING:
+    from model import Manager
+    from rules import Rule
+
+
+def _near(boards: numpy.ndarray, distance: int) -> numpy.ndarray:
+    """Return mask of grids within distance of set grids of (N, size, size) boards"""
+    count, size = boards.shape[0], boards.shape[-1]
+    padded = numpy.zeros((count, size + distance * 2, size + distance * 2),
+                         dtype=bool)
+    padded[:, distance:-distance, distance:-distance] = boards != EMPTY
+    near = numpy.zeros((count, size, size), dtype=bool)
+    for drow in range(distance * 2 + 1):
+        for dcolumn in range(distance * 2 + 1):
+            near |= padded[:, drow:drow + size, dcolumn:dcolumn + size]
+    return near
+
+
+@lru_cache(maxsize=None)
+def _around(size: int) -> numpy.ndarray:
+    """Return (size * size, size * size) masks of grids next to every grid"""
+    single = numpy.eye(size * size, dtype=numpy.int8).reshape(-1, size, size)
+    return _near(single, 1).reshape(size * size, -1)
+
+
+class Tree:
+    """Search tree of nodes stored by index in arrays, root is node 0"""
+
+    def __init__(self, capacity: int = 1 << 12) -> None:
+        self.size = 1
+        self.parent = numpy.full(capacity, -1, dtype=numpy.int32)
+        self.move = numpy.full(capacity, -1, dtype=numpy.int32)
+        self.first = numpy.full(capacity, -1, dtype=numpy.int32)
+        self.count = numpy.zeros(capacity, dtype=numpy.int32)
+        self.visits = numpy.zeros(capacity, dtype=numpy.float64)
+        self.wins = numpy.zeros(capacity, dtype=numpy.float64)  # Of the mover
+        self.won = numpy.zeros(capacity, dtype=bool)  # Move wins at once
+
+    def _reserve(self, count: int) -> None:
+        """Grow arrays by doubling to hold count more nodes"""
+        capacity = len(self.parent)
+        if self.size + count <= capacity:
+            return
+        while self.size + count > capacity:
+            capacity *= 2
+        for name, fill in (("parent", -1), ("move", -1), ("first", -1),
+                           ("count", 0), ("visits", 0), ("wins", 0),
+                           ("won", False)):
+            old = getattr(self, name)
+            new = numpy.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def expand(self, node: int, moves: numpy.ndarray) -> None:
+        """Add moves (flat grid indexes) as children of node"""
+        self._reserve(len(moves))
+        start, stop = self.size, self.size + len(moves)
+        self.parent[start:stop] = node
+        self.move[start:stop] = moves
+        self.first[node], self.count[node] = start, len(moves)
+        self.size = stop
+
+    def select(self, node: int, exploration: float) -> int:
+        """Return child of node with the highest UCT bound, unvisited first"""
+        start = self.first[node]
+        stop = start + self.count[node]
+        visits = self.visits[start:stop]
+        unvisited = numpy.flatnonzero(visits == 0)
+        if len(unvisited):
+            return int(start + unvisited[0])
+        bounds = self.wins[start:stop] / visits + exploration * numpy.sqrt(
+            log(self.visits[node]) / visits)
+        return int(start + bounds.argmax())
+
+    def best(self) -> int:
+        """Return most visited child of root"""
+        start = self.first[0]
+        return int(start + self.visits[start:start + self.count[0]].argmax())
+
+    def visit(self, node: int, visits: float) -> None:
+        """Add playouts in flight to node and all ancestors, as losses of all"""
+        while node >= 0:
+            self.visits[node] += visits
+            node = self.parent[node]
+
+    def update(self, node: int, visits: float, wins: float) -> None:
+        """Add wins of visited playouts to node and all ancestors, of node mover"""
+        while node >= 0:
+            self.wins[node] += wins
+            wins = visits - wins
+            node = self.parent[node]
+
+
+class MCTS:
+    """UCT search valued by batched random playouts"""
+
+    def __init__(self, rule: "Rule", limit: float = 1.0, playouts: int = 256,
+                 leaves: int = 32, exploration: float = sqrt(2),
+                 distance: int = 1, seed: Optional[int] = None) -> None:
+        """
+        Initialize a new search:
+            rule: rule deciding legal root moves and if overline wins
+            limit: hard time limit of every search in seconds
+            playouts: random games played together in every batch
+            leaves: leaves selected for every batch, sharing its playouts
+            exploration: UCT exploration constant
+            distance: tree moves are unset grids this close to set ones,
+                      root moves are searched within distance + 1
+            seed: seed of random playouts
+        """
+        self._rule = rule
+        self._limit = limit
+        self._playouts = playouts
+        self._leaves = leaves
+        self._exploration = exploration
+        self._distance = distance
+        self._random = numpy.random.default_rng(seed)
+        self.report = Report(None, 0, 0, 0.0)
+
+    def _roots(self, manager: "Manager", color: bool) -> numpy.ndarray:
+        """Return flat indexes of legal root moves near set grids, urgent first"""
+        size = manager.size
+        candidates = Candidates(manager, self._distance + 1)
+        grids = list(candidates) or [(size // 2, size // 2)]
+        candidates.close()
+        moves = [grid for grid in grids if legal(manager, self._rule, *grid, color)]
+        if not moves:
+            moves = [(row, column) for row in range(size) for column in range(size)
+                     if legal(manager, self._rule, row, column, color)]
+        moves.sort(key=lambda grid: priority(manager, *grid), reverse=True)
+        return numpy.array([row * size + column for row, column in moves],
+                           dtype=numpy.int64)
+
+    def _moves(self, board: numpy.ndarray) -> numpy.ndarray:
+        """Return flat indexes of tree moves of a board"""
+        empty = board == EMPTY
+        moves = numpy.flatnonzero(empty & _near(board[None], self._distance)[0])
+        return moves if len(moves) else numpy.flatnonzero(empty)
+
+    def _expand(self, tree: Tree, node: int, board: numpy.ndarray,
+                steps: int, moves: numpy.ndarray) -> None:
+        """
+        Add moves as children of node, all of them tried at once,
+        a node with a winning move only keeps that move
+        """
+        games = VectorGame(len(moves), board.shape[0], self._rule)
+        games.load(board, steps)
+        won, _invalid = games.step(moves)
+        if won.any():
+            moves = moves[won][:1]
+        tree.expand(node, moves)
+        tree.won[tree.first[node]:tree.size] = won.any()
+
+    def _playout(self, games: VectorGame, boards: numpy.ndarray,
+                 steps: numpy.ndarray,
+                 deadline: float = float("inf")) -> Optional[numpy.ndarray]:
+        """
+        Play random games from (N, size, size) boards to the end,
+        return winner of every game, None if deadline passed first.
+        Every game plays unset grids next to set ones in an order drawn
+        once, other grids only when no such grid is left.
+        """
+        games.load(boards, steps)
+        count, size = len(games.done), boards.shape[-1]
+        around, indexes = _around(size), numpy.arange(count)
+
+        # Keys of grids: random rank, plus size * size next to set grids,
+        # -1 if set, every game plays grid of the highest key
+        bonus = numpy.int16(size * size)
+        keys = self._random.permuted(numpy.tile(
+            numpy.arange(size * size, dtype=numpy.int16), (count, 1)), axis=1)
+        near = _near(boards, 1).reshape(count, -1)
+        keys[near] += bonus
+        keys[boards.reshape(count, -1) != EMPTY] = -1
+        while not games.done.all():
+            if perf_counter() > deadline:
+                return None
+            actions = keys.argmax(axis=1)
+            games.step(actions)
+            added = around[actions]
+            added &= ~near
+            near |= added
+            keys[added] += bonus
+            keys[indexes, actions] = -1
+        return games.winner
+
+    def _select(self, tree: Tree, path: VectorGame, board: numpy.ndarray,
+                steps: int) -> Tuple[int, int]:
+        """
+        Select down to a leaf on path loaded with root position,
+        expand it and step into its first child, return node and depth
+        """
+        path.load(board, steps)
+        node, depth = 0, 0
+        while tree.count[node] and not tree.won[node]:
+            node = tree.select(node, self._exploration)
+            path.step(numpy.array([tree.move[node]]))
+            depth += 1
+        if not tree.won[node] and not path.done[0]:
+            self._expand(tree, node, path.boards[0], int(path.steps[0]),
+                         self._moves(path.boards[0]))
+            node = tree.select(node, self._exploration)
+            path.step(numpy.array([tree.move[node]]))
+            depth += 1
+        return node, depth
+
+    def __call__(self, manager: "Manager",
+                 color: bool) -> Optional[Tuple[int, int]]:
+        """
+        Return most visited move for color within time limit,
+        None if there is no legal move.
+        Moves after the root only follow win semantics of the rule.
+        """
+        start = perf_counter()
+        deadline = start + self._limit
+        size = manager.size
+        roots = self._roots(manager, color)
+        if not len(roots):
+            self.report = Report(None, 0, 0, perf_counter() - start)
+            return None
+
+        board = numpy.zeros((size, size), dtype=numpy.int8)
+        for row, column in manager.records:
+            board[row, column] = BLACK if manager[row, column] else WHITE
+
+        # Steps only decide color to move in VectorGame
+        steps = manager.steps + (manager.steps % 2 != (0 if color else 1))
+        tree = Tree()
+        self._expand(tree, 0, board, steps, roots)
+        path = VectorGame(1, size, self._rule)
+        share = max(self._playouts // self._leaves, 1)
+        playouts, deepest = 0, 0
+        while not tree.won[tree.first[0]] and perf_counter() < deadline:
+            # Select leaves of a batch, ended ones are valued at once
+            leaves, boards, turns = list(), list(), list()
+            for _index in range(self._leaves):
+                if perf_counter() > deadline:
+                    break
+                node, depth = self._select(tree, path, board, steps)
+                deepest = max(deepest, depth)
+                tree.visit(node, share)
+                if tree.won[node]:
+                    tree.update(node, share, share)
+                elif path.done[0]:
+                    tree.update(node, share, share / 2)
+                else:
+                    leaves.append(node)
+                    boards.append(path.boards[0].copy())
+                    turns.append(int(path.steps[0]))
+            if not leaves:
+                continue
+
+            # Value leaves by playouts for the color who moved into them
+            games = VectorGame(len(leaves) * share, size, self._rule)
+            winner = self._playout(
+                games, numpy.repeat(numpy.array(boards), share, axis=0),
+                numpy.repeat(turns, share), deadline)
+            if winner is None:
+                for node in leaves:
+                    tree.visit(node, -share)
+                break
+            playouts += len(winner)
+            movers = numpy.where(numpy.array(turns) % 2 == 0, WHITE, BLACK)
+            results = winner.reshape(len(leaves), share)
+            wins = (results == movers[:, None]).sum(axis=1) + \
+                (results == EMPTY).sum(axis=1) / 2
+            for node, value in zip(leaves, wins):
+                tree.update(node, share, float(value))
+
+        move = tree.best()
+        row, column = divmod(int(tree.move[move]), size)
+        self.report = Report((row, column), deepest, playouts,
+                             perf_counter() - start)
+        return row, column
+
+
+if __name__ == "__main__":
+
+    from model import Manager
+    from rules import FreeStyle, Pro, Standard
+
+    # Test tree growth keeps nodes and backs up wins of each mover
+    tree = Tree(capacity=2)
+    tree.expand(0, numpy.array([3, 4, 5]))
+    tree.expand(1, numpy.array([6]))
+    assert(tree.size == 5 and list(tree.parent[:5]) == [-1, 0, 0, 0, 1])
+    tree.visit(4, 10)
+    tree.update(4, 10, 7)
+    assert(tree.visits[0] == 10 and tree.wins[1] == 3 and tree.wins[4] == 7)
+    assert(tree.select(0, 1.0) == 2)
+
+    # Test search takes the winning move without playouts
+    manager = Manager(15)
+    for column in range(4):
+        manager[7, column + 3] = True
+        manager[9, column + 3] = False
+    search = MCTS(FreeStyle(), limit=2.0, playouts=64, seed=15)
+    assert(search(manager, True) in {(7, 2), (7, 7)})
+    assert(manager.steps == 8 and search.report.nodes == 0)
+
+    # Test overline semantics of rule: six wins at once only in FreeStyle
+    manager = Manager(15)
+    for column in (0, 1, 2, 4, 5):
+        manager[7, column] = True
+        manager[0, column * 2] = False
+    search = MCTS(FreeStyle(), limit=2.0, playouts=64, seed=15)
+    assert(search(manager, True) == (7, 3) and search.report.elapsed < 2.0)
+    search = MCTS(Standard(), limit=0.5, playouts=64, seed=15)
+    search(manager, True)
+    assert(search.report.elapsed >= 0.5)
+
+    # Test playouts in flight spread selections over root moves
+    from core.vector import VectorGame
+    manager = Manager(15)
+    manager[7, 7] = True
+    board = numpy.zeros((15, 15), dtype=numpy.int8)
+    board[7, 7] = BLACK
+    search, tree = MCTS(Standard(), seed=15), Tree()
+    search._expand(tree, 0, board, 1, search._roots(manager, False))
+    path, selected = VectorGame(1, 15, Standard()), set()
+    for _index in range(8):
+        node, depth = search._select(tree, path, board, 1)
+        tree.visit(node, 8)
+        selected.add(int(tree.parent[node]))
+    assert(len(selected) == 8 and depth == 2)
+
+    # Test time limit holds inside a batch of playouts
+    search = MCTS(Standard(), limit=0.05, seed=15)
+    search(manager, False)
+    assert(search.report.elapsed < 0.1)
+
+    # Test search blocks the opponent four
+    manager = Manager(15)
+    for row in range(4):
+        manager[7, row] = True
+        manager[row * 3, 14] = False
+    search = MCTS(Standard(), limit=3.0, playouts=128, seed=15)
+    assert(search(manager, False) == (7, 4))
+    assert(search.report.depth >= 2 and search.report.nps > 0)
+
+    # Test root moves follow the rule
+    assert(MCTS(Pro(15), limit=0.2)(Manager(15), True) == (7, 7))
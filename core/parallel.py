@@ -0,0 +1,213 @@
+"""
+Parallel search
+Lazy SMP: every worker process searches the same position to the same
+time limit, starting from a different root move, and all of them share
+one transposition table in shared memory. Workers finding cut-offs and
+exact scores early make the others skip subtrees, the deepest finished
+result is played.
+Table entries are two 64-bit words, key XOR data and data, written
+without locks, a torn entry fails the key check and reads as a miss.
+"""
+
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+from model import Manager
+from core.search import Entry, Report, Search
+
+if TYPE_CHECKING:
+    from rules import Rule
+
+
+MASK = (1 << 64) - 1
+SIGN = 1 << 31  # Scores are stored as 32-bit signed integers
+
+
+def _release(memory: SharedMemory, view: memoryview, owner: bool) -> None:
+    """Release view of shared memory, unlink it if created here"""
+    view.release()
+    memory.close()
+    if owner:
+        memory.unlink()
+
+
+class SharedTable:
+    """Fixed-size transposition table in shared memory, replaced always"""
+
+    def __init__(self, slots: int = 1 << 20, name: Optional[str] = None) -> None:
+        """
+        Create a table of slots entries,
+        or attach to the table created with name in another process
+        """
+        self._memory = SharedMemory(name, create=name is None, size=slots * 16)
+        self._slots = slots
+        self._view = self._memory.buf.cast("Q")
+        self._finalizer = weakref.finalize(
+            self, _release, self._memory, self._view, name is None)
+
+    @property
+    def name(self) -> str:
+        """Return shared memory name for attaching"""
+        return self._memory.name
+
+    @property
+    def slots(self) -> int:
+        """Return count of entries"""
+        return self._slots
+
+    def close(self) -> None:
+        """Detach table, destroy it if created by this process"""
+        self._finalizer()
+
+    def get(self, key: int) -> Optional[Entry]:
+        """Return entry of key, None if missing or overwritten"""
+        index = (key % self._slots) * 2
+        data = self._view[index + 1]
+        if not data or self._view[index] ^ data != key:  # Empty or not key
+            return None
+        score = data >> 32
+        return ((data >> 24) & 0xFF, score - (score & SIGN) * 2,
+                (data >> 16) & 0xFF, ((data >> 8) & 0xFF, data & 0xFF))
+
+    def __setitem__(self, key: int, entry: Entry) -> None:
+        """Store entry of key over whatever was in its slot"""
+        depth, score, flag, (row, column) = entry
+        data = (score & 0xFFFFFFFF) << 32 | depth << 24 | flag << 16 | \
+            row << 8 | column
+        index = (key % self._slots) * 2
+        self._view[index] = (key ^ data) & MASK
+        self._view[index + 1] = data
+
+
+class Helper(Search):
+    """Search of one worker, starting every depth from its own root move"""
+
+    def __init__(self, rule: "Rule", limit: float, depth: int, width: int,
+                 table: SharedTable, helper: int) -> None:
+        super().__init__(rule, limit, depth, width, table)
+        self._helper = helper
+
+    def _root(self, manager: "Manager", color: bool, depth: int,
+              moves: List[Tuple[int, int]]) -> Tuple[Tuple[int, int], int]:
+        """Search root moves rotated by helper index"""
+        shift = self._helper % len(moves)
+        return super()._root(manager, color, depth,
+                             moves[shift:] + moves[:shift])
+
+
+# Table attached once by every worker process
+_table: Optional[SharedTable] = None
+
+
+def _attach(name: str, slots: int) -> None:
+    """Attach worker process to shared table"""
+    global _table
+    _table = SharedTable(slots, name)
+
+
+def _think(rule: "Rule", size: int, records: List[Tuple[int, int, bool]],
+           color: bool, limit: float, depth: int, width: int,
+           helper: int) -> Tuple[Optional[Tuple[int, int]], Report]:
+    """Search position of records in a worker, return move and report"""
+    assert _table is not None
+    manager = Manager(size)
+    for row, column, value in records:
+        manager[row, column] = value
+    search = Helper(rule, limit, depth, width, _table, helper)
+    return search(manager, color), search.report
+
+
+class ParallelSearch:
+    """Lazy SMP search across worker processes, called like Search"""
+
+    def __init__(self, rule: "Rule", limit: float = 1.0, depth: int = 10,
+                 width: int = 12, workers: int = 2,
+                 slots: int = 1 << 20) -> None:
+        """
+        Initialize a parallel search:
+            rule: rule deciding won and invalid positions, must be picklable
+            limit, depth, width: limits of every worker as Search
+            workers: count of worker processes
+            slots: entries of shared transposition table (16 bytes each)
+        """
+        self._rule = rule
+        self._limit = limit
+        self._depth = depth
+        self._width = width
+        self._workers = workers
+        self._table = SharedTable(slots)
+        self._executor = ProcessPoolExecutor(
+            workers, initializer=_attach,
+            initargs=(self._table.name, slots))
+        self.report = Report(None, 0, 0, 0.0)
+
+    def close(self) -> None:
+        """Stop worker processes and destroy shared table"""
+        self._executor.shutdown()
+        self._table.close()
+
+    def __call__(self, manager: "Manager", color: bool,
+                 limit: Optional[float] = None) -> Optional[Tuple[int, int]]:
+        """
+        Return move of the deepest finished worker for color,
+        within limit of this search if given,
+        None if there is no legal move. Manager is left untouched.
+        """
+        start = perf_counter()
+        records = [(row, column, bool(manager[row, column]))
+                   for row, column in manager.records]
+        futures = [self._executor.submit(
+            _think, self._rule, manager.size, records, color,
+            self._limit if limit is None else limit,
+            self._depth, self._width, helper)
+            for helper in range(self._workers)]
+        results = [future.result() for future in futures]
+
+        # Deepest wins, helper 0 searched the natural order on ties
+        move, report = max(results, key=lambda result: result[1].depth)
+        self.report = Report(move, report.depth,
+                             sum(report.nodes for _move, report in results),
+                             perf_counter() - start)
+        return move
+
+
+if __name__ == "__main__":
+
+    from rules import FreeStyle, Renju
+    from core.search import EXACT, LOWER
+
+    # Test table entries round trip and shared between attachments
+    table = SharedTable(1 << 10)
+    other = SharedTable(1 << 10, table.name)
+    table[12345] = (3, -(1 << 30) + 9, LOWER, (14, 0))
+    assert(other.get(12345) == (3, -(1 << 30) + 9, LOWER, (14, 0)))
+    assert(other.get(12345 + (1 << 10)) is None and other.get(0) is None)
+    other[(1 << 64) - 1] = (10, 77, EXACT, (7, 7))
+    assert(table.get((1 << 64) - 1) == (10, 77, EXACT, (7, 7)))
+    other.close()
+    assert(table.get(12345) is not None)
+    table.close()
+
+    # Test parallel search takes the winning move and blocks a four
+    manager = Manager(15)
+    for column in range(4):
+        manager[7, column + 3] = True
+        manager[9, column + 3] = False
+    search = ParallelSearch(FreeStyle(), limit=0.5, workers=3, slots=1 << 16)
+    assert(search(manager, True) in {(7, 2), (7, 7)})
+    assert(manager.steps == 8)
+    manager = Manager(15)
+    for row in range(4):
+        manager[7, row] = True
+        manager[row * 3, 14] = False
+    assert(search(manager, False) == (7, 4))
+    assert(search.report.depth >= 1 and search.report.nodes > 0)
+    search.close()
+
+    # Test rules with state are searched in workers
+    search = ParallelSearch(Renju(), limit=0.2, workers=2, slots=1 << 16)
+    assert(search(Manager(15), True) == (7, 7))
+    search.close()
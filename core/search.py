@@ -0,0 +1,310 @@
+"""
+Alpha-beta search
+Negamax with iterative deepening, transposition table and a hard time limit.
+"""
+
+from time import perf_counter
+from typing import List, NamedTuple, Optional, Protocol, Tuple, TYPE_CHECKING
+
+from model import DIRECTIONS, Candidates
+from error import GameWon, InvalidPosition, RuleException
+from core.evaluate import Evaluator
+
+if TYPE_CHECKING:
+    from model import Manager
+    from rules import Rule
+
+
+WIN = 1 << 30  # Score of won position
+SCORES = (0, 1, 10, 100, 1000, 100000)  # Score of pieces next to a grid
+
+# Flags of transposition table entries
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Transposition table entry: depth, score, flag and best move
+Entry = Tuple[int, int, int, Tuple[int, int]]
+
+
+class Table(Protocol):
+    """Transposition table keyed by Zobrist hash, like a dict"""
+
+    def get(self, key: int) -> Optional[Entry]: ...
+
+    def __setitem__(self, key: int, entry: Entry) -> None: ...
+
+
+class Timeout(Exception):
+    """Raise when search time limit exceeded"""
+
+
+class Report(NamedTuple):
+    """Statistics of the last search"""
+    move: Optional[Tuple[int, int]]
+    depth: int
+    nodes: int
+    elapsed: float
+
+    @property
+    def nps(self) -> float:
+        """Return nodes searched per second"""
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+
+def priority(manager: "Manager", row: int, column: int) -> int:
+    """Return how urgent a grid is by pieces next to it for both colors"""
+    size, total = manager.size, 0
+    for drow, dcolumn in DIRECTIONS.values():
+        counts = {True: 0, False: 0}
+        for sign in (1, -1):
+            nrow, ncolumn = row + drow * sign, column + dcolumn * sign
+            if not (0 <= nrow < size and 0 <= ncolumn < size):
+                continue
+            color = manager[nrow, ncolumn]
+            while color is not None:
+                counts[color] += 1
+                nrow, ncolumn = nrow + drow * sign, ncolumn + dcolumn * sign
+                if not (0 <= nrow < size and 0 <= ncolumn < size) or \
+                        not manager[nrow, ncolumn] is color:
+                    break
+        total += SCORES[min(counts[True], 4) + 1] + \
+            SCORES[min(counts[False], 4) + 1]
+    return total
+
+
+def legal(manager: "Manager", rule: "Rule", row: int, column: int,
+          color: bool) -> bool:
+    """Probe if rule allows color playing at (row, column)"""
+    if manager[row, column] is not None:
+        return False
+    manager.make(row, column, color)
+    try:
+        rule((row, column), manager.steps,
+             rule.situation(manager, row, column))
+    except InvalidPosition:
+        return False
+    except (GameWon, RuleException):
+        return True
+    finally:
+        manager.unmake()
+    return True
+
+
+class Search:
+    """Negamax alpha-beta search with iterative deepening"""
+
+    def __init__(self, rule: "Rule", limit: float = 1.0,
+                 depth: int = 10, width: int = 12,
+                 table: Optional[Table] = None) -> None:
+        """
+        Initialize a new search:
+            rule: rule deciding won and invalid positions
+            limit: hard time limit of every search in seconds
+            depth: maximum depth of iterative deepening
+            width: maximum moves searched of every node
+            table: transposition table, a private dict if not given
+        """
+        self._rule = rule
+        self._limit = limit
+        self._depth = depth
+        self._width = width
+        self._nodes = 0
+        self._deadline = 0.0
+        self._table: Table = dict() if table is None else table
+        self._evaluator: Evaluator
+        self._candidates: Candidates
+        self.report = Report(None, 0, 0, 0.0)
+
+    def _won(self, manager: "Manager", row: int, column: int) -> bool:
+        """Return if the piece just played wins"""
+        color = manager[row, column]
+        for direction in DIRECTIONS:
+            if self._rule.winning(manager.length(row, column, direction), color):
+                return True
+        return False
+
+    def _candidates_of(self, manager: "Manager") -> List[Tuple[int, int]]:
+        """Return unset grids near set grids, centre of an empty board"""
+        if not manager.steps:
+            return [(manager.size // 2, manager.size // 2)]
+        return list(self._candidates)
+
+    def _moves(self, manager: "Manager",
+               first: Optional[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Return ordered moves of a node, transposition move first"""
+        moves = self._candidates_of(manager)
+        moves.sort(key=lambda grid: priority(manager, *grid), reverse=True)
+        moves = moves[:self._width]
+        if first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    def _negamax(self, manager: "Manager", color: bool, depth: int,
+                 alpha: int, beta: int) -> int:
+        """Return score of position for color to move"""
+        self._nodes += 1
+        if not self._nodes & 0xF and perf_counter() > self._deadline:
+            raise Timeout("Search time limit exceeded")
+        if depth == 0:
+            return self._evaluator.score(color)
+
+        # Probe transposition table
+        key, origin = manager.zobrist, alpha
+        entry = self._table.get(key)
+        first = None
+        if entry is not None:
+            edepth, score, flag, first = entry
+            if edepth >= depth:
+                if flag == EXACT:
+                    return score
+                if flag == LOWER and score >= beta:
+                    return score
+                if flag == UPPER and score <= alpha:
+                    return score
+
+        moves = self._moves(manager, first)
+        if not moves:
+            return 0
+        best, bestmove = -WIN, moves[0]
+        for row, column in moves:
+            manager.make(row, column, color)
+            try:
+                if self._won(manager, row, column):
+                    score = WIN - manager.steps
+                else:
+                    score = -self._negamax(
+                        manager, not color, depth - 1, -beta, -alpha)
+            finally:
+                manager.unmake()
+            if score > best:
+                best, bestmove = score, (row, column)
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        flag = EXACT
+        if best <= origin:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        self._table[key] = (depth, best, flag, bestmove)
+        return best
+
+    def _root(self, manager: "Manager", color: bool, depth: int,
+              moves: List[Tuple[int, int]]) -> Tuple[Tuple[int, int], int]:
+        """Search all root moves to depth, return best one and its score"""
+        alpha, beta = -WIN, WIN
+        best, bestmove = -WIN - 1, moves[0]
+        for row, column in moves:
+            manager.make(row, column, color)
+            try:
+                if self._won(manager, row, column):
+                    return (row, column), WIN
+                score = -self._negamax(
+                    manager, not color, depth - 1, -beta, -alpha)
+            finally:
+                manager.unmake()
+            if score > best:
+                best, bestmove = score, (row, column)
+            alpha = max(alpha, score)
+        return bestmove, best
+
+    def __call__(self, manager: "Manager", color: bool,
+                 limit: Optional[float] = None) -> Optional[Tuple[int, int]]:
+        """
+        Return best move for color within time limit,
+        or limit of this search if given,
+        None if there is no legal move.
+        Manager will be used for searching, pass a copy if it is shared.
+        """
+        start = perf_counter()
+        self._deadline = start + (self._limit if limit is None else limit)
+        self._nodes = 0
+
+        # Root moves must be allowed by rule, probed before candidates
+        # index watches manager so probes do not update it
+        self._candidates = Candidates(manager)
+        self._candidates.close()
+        moves = [grid for grid in self._candidates_of(manager)
+                 if legal(manager, self._rule, *grid, color)]
+        if not moves:
+            moves = [(row, column)
+                     for row in range(manager.size)
+                     for column in range(manager.size)
+                     if legal(manager, self._rule, row, column, color)]
+        if not moves:
+            self.report = Report(None, 0, 0, perf_counter() - start)
+            return None
+        moves.sort(key=lambda grid: priority(manager, *grid), reverse=True)
+        self._candidates = Candidates(manager)
+
+        # Iterative deepening, keep move of last finished depth
+        move, finished = moves[0], 0
+        self._evaluator = Evaluator(manager)
+        for depth in range(1, self._depth + 1):
+            try:
+                move, score = self._root(manager, color, depth, moves)
+            except Timeout:
+                break
+            finished = depth
+            moves.remove(move)
+            moves.insert(0, move)
+
+            # Stop deepening once the game result is decided
+            if abs(score) > WIN - manager.size ** 2:
+                break
+        self._evaluator.close()
+        self._candidates.close()
+
+        self.report = Report(move, finished, self._nodes,
+                             perf_counter() - start)
+        return move
+
+
+if __name__ == "__main__":
+
+    from model import Manager
+    from rules import FreeStyle, Pro, Renju
+
+    # Test search takes the winning move
+    manager = Manager(15)
+    for column in range(4):
+        manager[7, column + 3] = True
+        manager[9, column + 3] = False
+    search = Search(FreeStyle(), limit=1.0)
+    assert(search(manager, True) in {(7, 2), (7, 7)})
+    assert(manager.steps == 8)
+
+    # Test white overline wins under Renju, black overline does not
+    for color in (True, False):
+        manager = Manager(15)
+        for column in range(6):
+            manager[7, column] = color
+        assert(Search(Renju())._won(manager, 7, 2) is not color)
+
+    # Test search blocks the opponent four
+    manager = Manager(15)
+    for row in range(4):
+        manager[7, row] = True
+        manager[row * 3, 14] = False
+    assert(search(manager, False) == (7, 4))
+    assert(search.report.depth >= 1 and search.report.nps > 0)
+
+    # Test limit of one search replaces the default
+    assert(search(manager, False, limit=0.0) is not None)
+    assert(search.report.depth == 0 and search.report.elapsed < 1.0)
+
+    # Test a board filled but one grid, no move left below the root
+    manager = Manager(5)
+    for row in range(5):
+        for column in range(5):
+            if (row, column) != (4, 4):
+                manager[row, column] = (row + column // 2) % 2 == 0
+    search = Search(FreeStyle(), limit=0.5, depth=3)
+    assert(search(manager, False) == (4, 4) and manager.steps == 24)
+
+    # Test probing rule for legal moves
+    manager = Manager(15)
+    assert(not legal(manager, Pro(15), 0, 0, True))
+    assert(legal(manager, Pro(15), 7, 7, True) and manager.steps == 0)
+    assert(Search(Pro(15), limit=0.5)(manager, True) == (7, 7))
@@ -0,0 +1,123 @@
+"""
+Board symmetry
+Map positions to a canonical form under the 8 rotations and reflections
+of the square board. A transform is a number in range(8):
+    bit 4 - transpose, bit 1 - reverse rows, bit 2 - reverse columns,
+applied in this order.
+"""
+
+from functools import lru_cache
+from typing import Any, List, Sequence, Tuple, TYPE_CHECKING
+
+from core.algorithm import transpose
+from model import zobrist
+
+if TYPE_CHECKING:
+    from model import Manager
+
+
+IDENTITY = 0
+TRANSFORMS = tuple(range(8))
+
+
+def apply(transform: int, row: int, column: int, size: int) -> Tuple[int, int]:
+    """Return grid mapped by transform on board of size"""
+    if transform & 4:
+        row, column = column, row
+    if transform & 1:
+        row = size - 1 - row
+    if transform & 2:
+        column = size - 1 - column
+    return row, column
+
+
+def inverse(transform: int) -> int:
+    """Return transform mapping grids back"""
+    if transform & 4:
+        return 4 | (transform & 1) << 1 | (transform & 2) >> 1
+    return transform
+
+
+def orient(matrix: Sequence[Sequence[Any]], transform: int) -> List[List[Any]]:
+    """Return square matrix mapped by transform"""
+    result = [list(line) for line in matrix]
+    if transform & 4:
+        result = transpose(result)
+    if transform & 1:
+        result.reverse()
+    if transform & 2:
+        for line in result:
+            line.reverse()
+    return result
+
+
+@lru_cache(maxsize=None)
+def tables(size: int) -> Tuple[Tuple[int, ...], ...]:
+    """Return flat index of every grid mapped by every transform"""
+    return tuple(
+        tuple(row * size + column for row, column in
+              (apply(transform, index // size, index % size, size)
+               for index in range(size * size)))
+        for transform in TRANSFORMS
+    )
+
+
+def hashes(manager: "Manager") -> List[int]:
+    """Return Zobrist hash of position mapped by every transform"""
+    size, keys = manager.size, zobrist(manager.size)
+    result = [0] * len(TRANSFORMS)
+    for row, column in manager.records:
+        colorkeys = keys[manager[row, column]]
+        index = row * size + column
+        for transform, table in enumerate(tables(size)):
+            result[transform] ^= colorkeys[table[index]]
+    return result
+
+
+def canonical(manager: "Manager") -> Tuple[int, int]:
+    """
+    Return (key, transform) of position, key is the least hash
+    of all symmetric positions and transform maps grids of manager
+    to the canonical position
+    """
+    values = hashes(manager)
+    key = min(values)
+    return key, values.index(key)
+
+
+if __name__ == "__main__":
+
+    from model import Manager
+
+    # Test inverse and matrix orientation against grid mapping
+    size = 5
+    matrix = [[row * size + column for column in range(size)]
+              for row in range(size)]
+    for transform in TRANSFORMS:
+        oriented = orient(matrix, transform)
+        for row in range(size):
+            for column in range(size):
+                mrow, mcolumn = apply(transform, row, column, size)
+                assert(oriented[mrow][mcolumn] == matrix[row][column])
+                assert(apply(inverse(transform), mrow, mcolumn, size) ==
+                       (row, column))
+    assert(len({tuple(map(tuple, orient(matrix, transform)))
+                for transform in TRANSFORMS}) == 8)
+
+    # Test symmetric positions share canonical key
+    moves = ((7, 7), (6, 8), (5, 5), (9, 3))
+    keys = set()
+    for transform in TRANSFORMS:
+        manager = Manager(15)
+        for row, column in moves:
+            manager[apply(transform, row, column, 15)] = manager.turn
+        assert(hashes(manager)[IDENTITY] == manager.zobrist)
+        key, found = canonical(manager)
+        keys.add(key)
+
+        # Canonical transform maps every position to the same grids
+        canonic = Manager(15)
+        for row, column in manager.records:
+            canonic[apply(found, row, column, 15)] = manager[row, column]
+        assert(canonic.zobrist == key)
+    assert(len(keys) == 1)
@@ -0,0 +1,314 @@
+"""
+Threat-space search
+Search forcing sequences only: continuous fours (VCF),
+and optionally fours and threes (VCT), to find a forced win.
+"""
+
+from time import perf_counter
+from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from model import DIRECTIONS
+from core.search import Report, Timeout
+
+if TYPE_CHECKING:
+    from model import Manager
+    from rules import Rule
+
+
+def completions(manager: "Manager", rule: "Rule", color: bool,
+                row: int, column: int) -> Set[Tuple[int, int]]:
+    """
+    Return unset grids that complete a five for color
+    together with the piece at (row, column)
+    """
+    size = manager.size
+    result: Set[Tuple[int, int]] = set()
+    for drow, dcolumn in DIRECTIONS.values():
+        for offset in range(-4, 5):
+            nrow, ncolumn = row + drow * offset, column + dcolumn * offset
+            if not (0 <= nrow < size and 0 <= ncolumn < size):
+                continue
+            if offset == 0 or not manager[nrow, ncolumn] is None:
+                continue
+
+            # Pieces in line if color played at (nrow, ncolumn)
+            pieces = [(nrow, ncolumn)]
+            for sign in (1, -1):
+                prow, pcolumn = nrow + drow * sign, ncolumn + dcolumn * sign
+                while 0 <= prow < size and 0 <= pcolumn < size and \
+                        manager[prow, pcolumn] is color:
+                    pieces.append((prow, pcolumn))
+                    prow, pcolumn = prow + drow * sign, pcolumn + dcolumn * sign
+            if (row, column) in pieces and rule.five(pieces, color):
+                result.add((nrow, ncolumn))
+    return result
+
+
+def threats(manager: "Manager", rule: "Rule",
+            color: bool) -> Set[Tuple[int, int]]:
+    """Return all unset grids that complete a five for color"""
+    result: Set[Tuple[int, int]] = set()
+    for row, column in manager.records:
+        if manager[row, column] is color:
+            result |= completions(manager, rule, color, row, column)
+    return result
+
+
+class Solver:
+    """Search forcing moves for a forced win"""
+
+    def __init__(self, rule: "Rule", vct: bool = False, depth: int = 10,
+                 nodes: int = 100000, limit: float = 1.0) -> None:
+        """
+        Initialize a new threat-space solver:
+            rule: rule deciding won positions
+            vct: also search threes (Victory by Continuous Threats)
+            depth: maximum attacking moves of a forcing line
+            nodes: maximum nodes of every solving
+            limit: hard time limit of every solving in seconds
+        """
+        self._rule = rule
+        self._vct = vct
+        self._depth = depth
+        self._nodes = nodes
+        self._limit = limit
+        self._count = 0
+        self._deadline = 0.0
+        self._failed: Dict[int, int] = dict()
+        self.report = Report(None, 0, 0, 0.0)
+
+    def _tick(self) -> None:
+        """Count node and check budgets, every node is costly enough to time"""
+        self._count += 1
+        if self._count > self._nodes:
+            raise Timeout("Solver node budget exceeded")
+        self._check()
+
+    def _check(self) -> None:
+        """Check time limit"""
+        if perf_counter() > self._deadline:
+            raise Timeout("Solver time limit exceeded")
+
+    @staticmethod
+    def _window(manager: "Manager", color: bool, row: int, column: int,
+                drow: int, dcolumn: int) -> int:
+        """
+        Return most pieces of color in windows of 5 grids through a grid,
+        windows with opponent piece or edge of board are not counted
+        """
+        size = manager.size
+        values = list()
+        for offset in range(-4, 5):
+            nrow, ncolumn = row + drow * offset, column + dcolumn * offset
+            if 0 <= nrow < size and 0 <= ncolumn < size:
+                values.append(manager[nrow, ncolumn])
+            else:
+                values.append(not color)
+        best = 0
+        for start in range(5):
+            window = values[start:start + 5]
+            if not (not color) in window:
+                best = max(best, window.count(color))
+        return best
+
+    def _attacks(self, manager: "Manager",
+                 color: bool) -> List[Tuple[int, Tuple[int, int]]]:
+        """Return (window pieces, grid) of attacking grids, strongest first"""
+        size, least = manager.size, 2 if self._vct else 3
+        result: Dict[Tuple[int, int], int] = dict()
+        for row, column in manager.records:
+            if not manager[row, column] is color:
+                continue
+            self._check()
+            for drow, dcolumn in DIRECTIONS.values():
+                for offset in (1, -1, 2, -2, 3, -3, 4, -4):
+                    nrow, ncolumn = row + drow * offset, column + dcolumn * offset
+                    if not (0 <= nrow < size and 0 <= ncolumn < size) or \
+                            not manager[nrow, ncolumn] is None:
+                        continue
+                    count = self._window(
+                        manager, color, nrow, ncolumn, drow, dcolumn)
+                    if count >= least and count > result.get((nrow, ncolumn), 0):
+                        result[(nrow, ncolumn)] = count
+        return sorted(((count, grid) for grid, count in result.items()),
+                      reverse=True)
+
+    def _threes(self, manager: "Manager", color: bool,
+                row: int, column: int) -> Set[Tuple[int, int]]:
+        """
+        Return defending grids if piece at (row, column) makes a three:
+        grids making an open four in the same line and completions of
+        those fours, empty set if it does not make a three.
+        """
+        size = manager.size
+        defences: Set[Tuple[int, int]] = set()
+        for drow, dcolumn in DIRECTIONS.values():
+            if self._window(manager, color, row, column, drow, dcolumn) < 3:
+                continue
+            for offset in (1, -1, 2, -2, 3, -3, 4, -4):
+                nrow, ncolumn = row + drow * offset, column + dcolumn * offset
+                if not (0 <= nrow < size and 0 <= ncolumn < size) or \
+                        not manager[nrow, ncolumn] is None:
+                    continue
+                manager.make(nrow, ncolumn, color)
+                try:
+                    fives = completions(
+                        manager, self._rule, color, row, column)
+                finally:
+                    manager.unmake()
+                if len(fives) >= 2:
+                    defences.add((nrow, ncolumn))
+                    defences |= fives
+        return defences
+
+    def _solve(self, manager: "Manager", color: bool,
+               depth: int) -> Optional[List[Tuple[int, int]]]:
+        """Return forcing line within depth attacks, None if not found"""
+        self._tick()
+        if depth <= 0 or self._failed.get(manager.zobrist, 0) >= depth:
+            return None
+
+        for count, (row, column) in self._attacks(manager, color):
+            manager.make(row, column, color)
+            try:
+                line = self._attack(manager, color, row, column, count, depth)
+            finally:
+                manager.unmake()
+            if line is not None:
+                return [(row, column)] + line
+
+        self._failed[manager.zobrist] = depth
+        return None
+
+    def _attack(self, manager: "Manager", color: bool, row: int, column: int,
+                count: int, depth: int) -> Optional[List[Tuple[int, int]]]:
+        """Return rest of forcing line after attacking at (row, column)"""
+        if count >= 3:
+            fives = completions(manager, self._rule, color, row, column)
+
+            # Open four or double four wins, four must be blocked
+            if len(fives) >= 2:
+                first, second = sorted(fives)[:2]
+                return [first, second]
+            if len(fives) == 1:
+                return self._defend(manager, color, fives, depth)
+
+        # Three: defender could block at any defending grid
+        if self._vct and depth > 1:
+            defences = self._threes(manager, color, row, column)
+            if defences:
+                return self._defend(manager, color, defences, depth)
+        return None
+
+    def _defend(self, manager: "Manager", color: bool,
+                defences: Set[Tuple[int, int]],
+                depth: int) -> Optional[List[Tuple[int, int]]]:
+        """Return forcing line which must win against every defence"""
+        line: Optional[List[Tuple[int, int]]] = None
+        for row, column in sorted(defences):
+            manager.make(row, column, not color)
+            try:
+                # Defender counter four breaks the forcing sequence
+                if completions(manager, self._rule, not color, row, column):
+                    return None
+                rest = self._solve(manager, color, depth - 1)
+            finally:
+                manager.unmake()
+            if rest is None:
+                return None
+            if line is None:
+                line = [(row, column)] + rest
+        return line
+
+    def __call__(self, manager: "Manager", color: bool,
+                 limit: Optional[float] = None) -> Optional[List[Tuple[int, int]]]:
+        """
+        Return forcing line of moves (both colors in turn) leading
+        color to a five, None if no forced win found within budgets,
+        time limit is replaced by limit of this solving if given.
+        Manager will be used for searching, pass a copy if it is shared.
+        """
+        start = perf_counter()
+        self._deadline = start + (self._limit if limit is None else limit)
+        self._count = 0
+        self._failed.clear()
+
+        # Immediate five, or opponent four must be blocked first
+        line: Optional[List[Tuple[int, int]]] = None
+        fives = threats(manager, self._rule, color)
+        if fives:
+            line = [min(fives)]
+        elif not threats(manager, self._rule, not color):
+            try:
+                for depth in range(1, self._depth + 1):
+                    line = self._solve(manager, color, depth)
+                    if line is not None:
+                        break
+            except Timeout:
+                line = None
+
+        self.report = Report(line[0] if line else None,
+                             len(line) if line else 0, self._count,
+                             perf_counter() - start)
+        return line
+
+
+if __name__ == "__main__":
+
+    from model import Manager
+    from rules import FreeStyle, Renju, Standard
+
+    # Test completions of four and broken four
+    manager = Manager(15)
+    for column in (3, 4, 5, 6):
+        manager[7, column] = True
+    assert(completions(manager, FreeStyle(), True, 7, 3) == {(7, 2), (7, 7)})
+    manager[7, 8] = True
+    assert(completions(manager, FreeStyle(), True, 7, 8) == {(7, 7)})
+    assert(completions(manager, Standard(), True, 7, 8) == set())
+    assert(completions(manager, Renju(), True, 7, 8) == set())
+    white = Manager(15)
+    for column in (3, 4, 5, 6, 8):
+        white[7, column] = False
+    assert(completions(white, Renju(), False, 7, 8) == {(7, 7)})
+    assert(threats(manager, Standard(), True) == {(7, 2)})
+
+    # Test VCF: closed threes crossing at (7, 6) make a double four
+    manager = Manager(15)
+    for row, column in [(7, 3), (7, 4), (7, 5), (4, 6), (5, 6), (6, 6)]:
+        manager[row, column] = True
+    for row, column in [(7, 2), (3, 6), (0, 0), (0, 14), (14, 0), (14, 14)]:
+        manager[row, column] = False
+    line = Solver(FreeStyle())(manager.copy(), True)
+    assert(line is not None and line[0] == (7, 6))
+    for step, (row, column) in enumerate(line):
+        manager[row, column] = step % 2 == 0
+    assert(any(FreeStyle().five(manager.line(*line[-1], direction), True)
+               for direction in DIRECTIONS))
+
+    # Test VCT finds double three which VCF cannot
+    manager = Manager(15)
+    for row, column in [(7, 5), (7, 6), (5, 8), (6, 8)]:
+        manager[row, column] = True
+    for row, column in [(0, 0), (0, 14), (14, 0), (14, 14)]:
+        manager[row, column] = False
+    assert(Solver(FreeStyle())(manager.copy(), True) is None)
+    line = Solver(FreeStyle(), vct=True)(manager.copy(), True)
+    assert(line is not None and len(line) % 2 == 1)
+
+    # Test opponent four must be blocked before attacking
+    manager[14, 1] = False
+    manager[14, 2] = False
+    manager[14, 3] = False
+    assert(Solver(FreeStyle(), vct=True)(manager.copy(), True) is None)
+
+    # Test time limit is checked on every node of a crowded board
+    import random
+    manager, generator = Manager(15), random.Random(15)
+    grids = [(row, column) for row in range(2, 13) for column in range(2, 13)]
+    generator.shuffle(grids)
+    for row, column in grids[:50]:
+        manager[row, column] = manager.turn
+    solver = Solver(Standard(), vct=True, limit=0.005)
+    solver(manager, manager.turn)
+    assert(solver.report.elapsed < 0.05)
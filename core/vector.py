@@ -0,0 +1,229 @@
+"""
+Vectorized games
+Many boards stored in one (N, size, size) int8 array,
+moves applied and wins checked for all games at once with NumPy.
+"""
+
+import numpy
+from functools import lru_cache
+from typing import Optional, Tuple, Union, TYPE_CHECKING
+
+from model import DIRECTIONS
+
+if TYPE_CHECKING:
+    from rules import Rule
+
+
+EMPTY, BLACK, WHITE = 0, 1, -1  # Values of grids, BLACK plays first
+REACH = 5  # Grids read on each side of a move to check lines
+
+
+@lru_cache(maxsize=None)
+def _wins(runs: Tuple[bool, ...]) -> numpy.ndarray:
+    """
+    Return if every line of 2 * REACH + 1 grids wins,
+    indexed by bits of own pieces, bit REACH is the centre,
+    runs tells if every length of pieces through the centre wins
+    """
+    table = numpy.zeros(1 << (REACH * 2 + 1), dtype=bool)
+    for bits in range(len(table)):
+        if not bits >> REACH & 1:
+            continue
+        start = stop = REACH
+        while start > 0 and bits >> (start - 1) & 1:
+            start -= 1
+        while stop < REACH * 2 and bits >> (stop + 1) & 1:
+            stop += 1
+        run = stop - start + 1
+        table[bits] = runs[run]
+    return table
+
+
+class VectorGame:
+    """
+    N games played at the same time
+    Only win semantics of rule (overline or exactly five of each color)
+    are applied, opening constraints and swaps are not supported.
+    """
+
+    def __init__(self, count: int, size: int, rule: "Rule") -> None:
+        """
+        Initialize N empty boards:
+            count: number of games
+            size: length and width of every board
+            rule: rule deciding if overline of every color wins
+        """
+        self._count, self._size = count, size
+
+        # Tables of white and black, indexed by if color is black
+        self._wins = numpy.stack([
+            _wins(tuple(rule.winning(run, color)
+                        for run in range(REACH * 2 + 2)))
+            for color in (False, True)])
+
+        # Boards are padded by REACH empty grids on each side
+        self._padded = numpy.zeros(
+            (count, size + REACH * 2, size + REACH * 2), dtype=numpy.int8)
+        self.steps = numpy.zeros(count, dtype=numpy.int32)
+        self.done = numpy.zeros(count, dtype=bool)
+        self.winner = numpy.zeros(count, dtype=numpy.int8)
+
+        # Offsets of lines through a grid, shape (4, 2 * REACH + 1)
+        offsets = numpy.arange(-REACH, REACH + 1)
+        steps = numpy.array(list(DIRECTIONS.values()))
+        self._rows = steps[:, :1] * offsets
+        self._columns = steps[:, 1:] * offsets
+        self._bits = (1 << (offsets + REACH)).astype(numpy.int16)
+
+    @property
+    def boards(self) -> numpy.ndarray:
+        """Return (N, size, size) view of all boards"""
+        return self._padded[:, REACH:-REACH, REACH:-REACH]
+
+    @property
+    def turn(self) -> numpy.ndarray:
+        """Return color to move of every game"""
+        return numpy.where(self.steps % 2 == 0, BLACK, WHITE).astype(numpy.int8)
+
+    def legal(self) -> numpy.ndarray:
+        """Return (N, size * size) mask of unset grids of running games"""
+        empty = self.boards.reshape(self._count, -1) == EMPTY
+        return empty & ~self.done[:, None]
+
+    def reset(self, mask: Optional[numpy.ndarray] = None) -> None:
+        """Reset all games, or games selected by mask"""
+        if mask is None:
+            mask = numpy.ones(self._count, dtype=bool)
+        self._padded[mask] = EMPTY
+        self.steps[mask] = 0
+        self.done[mask] = False
+        self.winner[mask] = EMPTY
+
+    def load(self, board: numpy.ndarray, steps: Union[int, numpy.ndarray],
+             mask: Optional[numpy.ndarray] = None) -> None:
+        """
+        Set all games, or games selected by mask, to running positions:
+            board: (size, size) grids of the position,
+                   or (N, size, size) grids of every selected game
+            steps: pieces played, its parity decides color to move,
+                   one for all or one of every selected game
+        """
+        if mask is None:
+            mask = numpy.ones(self._count, dtype=bool)
+        self.boards[mask] = board
+        self.steps[mask] = steps
+        self.done[mask] = False
+        self.winner[mask] = EMPTY
+
+    def lines(self, rows: numpy.ndarray, columns: numpy.ndarray,
+              games: Optional[numpy.ndarray] = None) -> numpy.ndarray:
+        """
+        Return (N, 4, 2 * REACH + 1) grids of lines through grids,
+        or (len(games), 4, 2 * REACH + 1) of selected games
+        """
+        if games is None:
+            games = numpy.arange(self._count)
+        width = self._size + REACH * 2
+        centres = (games * width + rows + REACH) * width + columns + REACH
+        return self._padded.reshape(-1).take(
+            centres[:, None, None] + self._rows * width + self._columns)
+
+    def fives(self, rows: numpy.ndarray, columns: numpy.ndarray,
+              colors: numpy.ndarray,
+              games: Optional[numpy.ndarray] = None) -> numpy.ndarray:
+        """Return if pieces of colors at grids make a five in any line"""
+        own = self.lines(rows, columns, games) == colors[:, None, None]
+        black = (colors == BLACK)[:, None]
+        return self._wins[black.astype(numpy.intp), own @ self._bits].any(axis=1)
+
+    def step(self, actions: numpy.ndarray) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Play one move (flat index row * size + column) in every game,
+        actions of ended games are ignored.
+        Return (won, invalid) masks of games.
+        """
+        actions = numpy.asarray(actions)
+        rows, columns = numpy.divmod(actions, self._size)
+        inside = (actions >= 0) & (actions < self._size * self._size)
+        rows, columns = numpy.where(inside, rows, 0), numpy.where(inside, columns, 0)
+
+        games = numpy.arange(self._count)
+        current = self.boards[games, rows, columns]
+        invalid = ~self.done & (~inside | (current != EMPTY))
+        playing = ~self.done & ~invalid
+
+        colors = self.turn
+        board = self.boards
+        board[games[playing], rows[playing], columns[playing]] = colors[playing]
+        self.steps[playing] += 1
+
+        # Only games just played could have won
+        won = numpy.zeros(self._count, dtype=bool)
+        indexes = games[playing]
+        won[indexes] = self.fives(rows[indexes], columns[indexes],
+                                  colors[indexes], indexes)
+        self.winner[won] = colors[won]
+        full = self.steps == self._size * self._size
+        self.done |= won | (playing & full)
+        return won, invalid
+
+
+if __name__ == "__main__":
+
+    from model import Manager
+    from rules import FreeStyle, Renju, Standard
+
+    # Test overline semantics of black and of white
+    for rule, expected in ((FreeStyle(), True), (Standard(), False),
+                           (Renju(), False)):
+        game = VectorGame(1, 15, rule)
+        for column in (0, 1, 2, 4, 5):
+            game.step(numpy.array([7 * 15 + column]))
+            game.step(numpy.array([0 * 15 + column * 2]))
+        won, _invalid = game.step(numpy.array([7 * 15 + 3]))
+        assert(bool(won[0]) == expected)
+    for rule, expected in ((Standard(), False), (Renju(), True)):
+        game = VectorGame(1, 15, rule)
+        game.step(numpy.array([14 * 15 + 14]))
+        for column in (0, 1, 2, 4, 5):
+            game.step(numpy.array([7 * 15 + column]))
+            game.step(numpy.array([0 * 15 + column * 2]))
+        won, _invalid = game.step(numpy.array([7 * 15 + 3]))
+        assert(bool(won[0]) == expected == (game.winner[0] == WHITE))
+
+    # Test random games against Manager and rules
+    generator = numpy.random.default_rng(15)
+    for rule in (FreeStyle(), Standard(), Renju()):
+        count, size = 64, 9
+        game = VectorGame(count, size, rule)
+        managers = [Manager(size) for _index in range(count)]
+        while not game.done.all():
+            scores = generator.random((count, size * size))
+            scores[~game.legal()] = -1
+            actions = scores.argmax(axis=1)
+            running = ~game.done
+            won, invalid = game.step(actions)
+            assert(not invalid[running].any())
+            for index in numpy.flatnonzero(running):
+                manager = managers[index]
+                row, column = divmod(int(actions[index]), size)
+                manager[row, column] = manager.turn
+                expected = any(rule.five(pieces, manager[row, column])
+                               for pieces in manager.find(row, column).values())
+                assert(bool(won[index]) == expected)
+        assert(game.winner.any())
+
+    # Test invalid moves and reset
+    game = VectorGame(2, 9, Standard())
+    game.step(numpy.array([0, 0]))
+    _won, invalid = game.step(numpy.array([0, 1]))
+    assert(list(invalid) == [True, False] and list(game.steps) == [1, 2])
+    game.reset(numpy.array([True, False]))
+    assert(list(game.steps) == [0, 2] and game.boards[0].sum() == 0)
+
+    # Test loading a position into selected games
+    board = game.boards[1].copy()
+    game.load(board, 2, numpy.array([True, False]))
+    assert((game.boards[0] == board).all() and list(game.turn) == [BLACK, BLACK])
+    won, invalid = game.step(numpy.array([1, 2]))
+    assert(list(invalid) == [True, False])
@@ -0,0 +1,146 @@
+"""
+Game instrumentation
+Time every phase of moves into log-scale histograms and count outcomes,
+attached to a game by Game.instrument and detached by passing None.
+"""
+
+from collections import Counter
+from time import perf_counter_ns
+from typing import Dict, List, Optional, Protocol, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from controller import Outcome
+
+
+# Phases of a move marked by controller
+PHASES = ("wait", "write", "find", "rule", "handle", "play", "toggle", "move")
+
+
+class Profiler(Protocol):
+    """Profiler enabled only while moves are handled, like cProfile.Profile"""
+
+    def enable(self) -> None: ...
+
+    def disable(self) -> None: ...
+
+
+class Histogram:
+    """Durations in nanoseconds counted in power of two buckets"""
+
+    def __init__(self) -> None:
+        self.buckets: List[int] = [0] * 64
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, duration: int) -> None:
+        """Count a duration"""
+        self.buckets[duration.bit_length()] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def percentile(self, percent: float) -> int:
+        """Return upper bound of bucket holding the percentile"""
+        target, seen = self.count * percent / 100, 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min(1 << index, self.max)
+        return 0
+
+    def summary(self) -> Dict[str, float]:
+        """Return count and microseconds of mean, p50, p99 and max"""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count / 1000 if self.count else 0.0,
+            "p50": self.percentile(50) / 1000,
+            "p99": self.percentile(99) / 1000,
+            "max": self.max / 1000,
+        }
+
+
+class Instruments:
+    """Histograms of move phases, outcome counters and a profiler hook"""
+
+    def __init__(self, profiler: Optional[Profiler] = None) -> None:
+        """
+        Initialize instruments:
+            profiler: enabled while every move is handled,
+                      could be replaced at any time of a live game
+        """
+        self.histograms: Dict[str, Histogram] = {
+            phase: Histogram() for phase in PHASES}
+        self.counters: "Counter[str]" = Counter()
+        self.profiler = profiler
+        self._start = self._last = perf_counter_ns()
+
+    def mark(self, phase: str) -> None:
+        """
+        Record time since last mark as phase,
+        empty phase starts a move
+        """
+        now = perf_counter_ns()
+        if phase:
+            self.histograms[phase].record(now - self._last)
+        else:
+            self._start = now
+            if self.profiler is not None:
+                self.profiler.enable()
+        self._last = now
+
+    def finish(self, outcome: "Outcome") -> None:
+        """Record whole move and count its outcome"""
+        if self.profiler is not None:
+            self.profiler.disable()
+        now = perf_counter_ns()
+        self.histograms["move"].record(now - self._start)
+        self.counters[outcome.value] += 1
+        self._last = now
+
+    def summary(self) -> Dict[str, object]:
+        """Return phases summaries in microseconds and outcome counts"""
+        return {
+            "phases": {phase: histogram.summary() for phase, histogram
+                       in self.histograms.items() if histogram.count},
+            "outcomes": dict(self.counters),
+        }
+
+
+if __name__ == "__main__":
+
+    import cProfile
+    import pstats
+    from controller import HeadlessGame, Outcome
+    from rules import Standard
+
+    # Test histogram buckets
+    histogram = Histogram()
+    for duration in (1, 3, 900, 1000, 1500):
+        histogram.record(duration)
+    assert(histogram.percentile(50) == 1024 and histogram.percentile(100) == 1500)
+    assert(histogram.summary()["count"] == 5)
+
+    # Test phases and outcomes of a game
+    profiler = cProfile.Profile()
+    instruments = Instruments(profiler)
+    game = HeadlessGame(9, {True: "Doge", False: "Meow"}, Standard())
+    game.instrument(instruments)
+    for column in range(4):
+        game.submit_move(0, column)
+        game.submit_move(0, column)
+        game.submit_move(1, column)
+    game.submit_move(0, 4)
+    summary = instruments.summary()
+    assert(summary["outcomes"] == {"played": 8, "invalid": 4, "won": 1})
+    phases = instruments.histograms
+    assert(phases["move"].count == 13 and phases["toggle"].count == 8)
+    assert(phases["rule"].count == 9 and phases["play"].count == 9)
+    assert(pstats.Stats(profiler).total_calls > 0)
+
+    # Test detaching
+    game.instrument(None)
+    game.restart()
+    game.submit_move(4, 4)
+    assert(phases["move"].count == 13)
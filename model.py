@@ -5,8 +5,28 @@ The manager provides related access interfaces.
 """
 
 from error import InvalidGridError, SettedGridError
-from collections import defaultdict
-from typing import List, Tuple, Union, Iterator, Set, Dict, Optional
+from random import Random
+from typing import Callable, List, Tuple, Union, Iterator, Set, Dict
+
+# Row and column step of directions used by find
+DIRECTIONS: Dict[int, Tuple[int, int]] = {
+    1: (1, 1), 2: (0, 1), 3: (1, -1), 4: (1, 0)
+}
+
+# Zobrist keys of every board size, generated with a fixed seed
+# so position hashes are stable between processes
+_ZOBRIST: Dict[int, Dict[bool, List[int]]] = dict()
+
+
+def zobrist(size: int) -> Dict[bool, List[int]]:
+    """Return 64-bit Zobrist keys of all grids for each color"""
+    if not size in _ZOBRIST:
+        generator = Random(size)
+        _ZOBRIST[size] = {
+            color: [generator.getrandbits(64) for _index in range(size * size)]
+            for color in (True, False)
+        }
+    return _ZOBRIST[size]
 
 
 class Manager:
@@ -24,27 +44,151 @@ class Manager:
         self._ended = False
         self._size = size
         self._records: List[Tuple[int, int]] = list()
-        self._board: List[List[Union[None, bool]]] = [
-            [None for _index in range(size)]
-            for _index in range(size)
-        ]
+        self._board: List[List[Union[None, bool]]]
+        self._clear()
+
+        # History tree of (position, color, parent) nodes, node 0 is root,
+        # children are ordered by last visit so redo follows the newest
+        self._tree: List[Tuple[Tuple[int, int], bool, int]]
+        self._children: List[List[int]]
+        self._node = 0
+        self._plant()
+
+        # Incremental Zobrist hash of position
+        self._keys = zobrist(size)
+        self._hash = 0
+
+        # Handlers called with (row, column, value) after grid changed,
+        # (-1, -1, None) is sent after reset
+        self._watchers: List[Callable[[int, int, Union[None, bool]], None]] = list()
 
     @property
     def size(self) -> int:
         """Return size of game board"""
         return self._size
 
-    def undo(self) -> Tuple[int, int]:
-        """Undo the last step"""
+    def watch(self, handler: Callable[[int, int, Union[None, bool]], None]) -> None:
+        """Call handler with (row, column, value) after every grid change"""
+        self._watchers.append(handler)
+
+    def unwatch(self, handler: Callable[[int, int, Union[None, bool]], None]) -> None:
+        """Stop calling a watching handler"""
+        self._watchers.remove(handler)
+
+    @property
+    def zobrist(self) -> int:
+        """Return 64-bit Zobrist hash of current position"""
+        return self._hash
+
+    def _read(self, row: int, column: int) -> Union[None, bool]:
+        """Return status of grid without index checking"""
+        return self._board[row][column]
+
+    def _write(self, row: int, column: int, value: Union[None, bool]) -> None:
+        """Set status of grid without index checking"""
+        self._board[row][column] = value
+
+    def _clear(self) -> None:
+        """Clear all grids"""
+        self._board = [
+            [None for _index in range(self._size)]
+            for _index in range(self._size)
+        ]
+
+    def copy(self) -> "Manager":
+        """Return an independent copy of this manager, history included"""
+        manager = type(self).__new__(type(self))
+        manager.__dict__.update(self.__dict__)
+        manager._board = [list(row) for row in self._board]
+        manager._records = list(self._records)
+        manager._tree = list(self._tree)
+        manager._children = [list(children) for children in self._children]
+        manager._watchers = list()
+        return manager
+
+    def _plant(self) -> None:
+        """Restart history tree as a single line of records"""
+        self._tree = [((-1, -1), False, -1)]
+        self._children = [list()]
+        self._node = 0
+        for index in self._records:
+            self._grow(index, self._read(*index))
+
+    def _grow(self, index: Tuple[int, int], color: bool) -> None:
+        """Move to child of current node playing index, add it if new"""
+        node = self._node
+        children = self._children[node]
+        for child in children:
+            position, stone, _parent = self._tree[child]
+            if position == index and stone is color:
+                children.remove(child)
+                children.append(child)
+                self._node = child
+                return
+        self._node = len(self._tree)
+        self._tree.append((index, color, node))
+        self._children.append(list())
+        children.append(self._node)
+
+    def make(self, row: int, column: int, color: bool) -> None:
+        """
+        Set an unset grid in O(1) without checking or recording history,
+        for searching, must be undone by unmake
+        """
+        self._records.append((row, column))
+        self._hash ^= self._keys[color][row * self._size + column]
+        self._write(row, column, color)
+        for watcher in self._watchers:
+            watcher(row, column, color)
+
+    def unmake(self) -> Tuple[int, int]:
+        """Unset the last set grid in O(1) without recording history"""
         row, column = self._records.pop()
-        self._board[row][column] = None
+        self._hash ^= self._keys[self._read(row, column)][row * self._size + column]
+        self._write(row, column, None)
+        for watcher in self._watchers:
+            watcher(row, column, None)
         return row, column
 
+    def undo(self) -> Tuple[int, int]:
+        """Undo the last step, it could be redone"""
+        position = self.unmake()
+        self._node = self._tree[self._node][2]
+        return position
+
+    def redo(self, variation: int = -1) -> Tuple[int, int]:
+        """
+        Replay a variation undone from current position,
+        the most recently visited by default
+        """
+        children = self._children[self._node]
+        if not children:
+            raise IndexError("Nothing to redo")
+        child = children.pop(variation)
+        children.append(child)
+        (row, column), color, _parent = self._tree[child]
+        self.make(row, column, color)
+        self._node = child
+        return row, column
+
+    @property
+    def variations(self) -> Tuple[Tuple[int, int], ...]:
+        """
+        Return positions could be redone, least recently visited first,
+        played or redone variations move to the end
+        """
+        return tuple(self._tree[child][0] for child in self._children[self._node])
+
     @property
     def steps(self) -> int:
         """Return steps count"""
         return len(self._records)
 
+    @property
+    def records(self) -> Tuple[Tuple[int, int], ...]:
+        """Return all played positions in order"""
+        return tuple(self._records)
+
     @property
     def turn(self) -> bool:
         """Return which turn"""
@@ -63,19 +207,21 @@ class Manager:
         """Reset game status"""
         self._records.clear()
         self._ended = False
-        self._board: List[List[Union[None, bool]]] = [
-            [None for _index in range(self._size)]
-            for _index in range(self._size)
-        ]
-
-    def _around(self, _x: int, _y: int) -> Iterator[Tuple[int, int]]:
-        """Return all grids's indexs around specific grid"""
+        self._hash = 0
+        self._clear()
+        self._plant()
+        for watcher in self._watchers:
+            watcher(-1, -1, None)
+
+    def _around(self, _x: int, _y: int,
+                distance: int = 1) -> Iterator[Tuple[int, int]]:
+        """Return all grids's indexs within distance of specific grid"""
         if _x >= self._size or _y >= self._size:
             raise InvalidGridError(
                 "Invalid index for ({x}, {y})".format(x=_x, y=_y))
 
-        for i in (_x - 1, _x, _x + 1):
-            for j in (_y - 1, _y, _y + 1):
+        for i in range(_x - distance, _x + distance + 1):
+            for j in range(_y - distance, _y + distance + 1):
                 if (i, j) == (_x, _y):
                     continue
                 if i < 0 or j < 0:
@@ -84,98 +230,107 @@ class Manager:
                     continue
                 yield (i, j)
 
-    def find(self, row: int, column: int,
-             paths: Optional[Dict[int, Set[Tuple[int, int]]]] = None,
-             direction: Optional[int] = None) -> Dict[int, Set[Tuple[int, int]]]:
+    def line(self, row: int, column: int, direction: int) -> Set[Tuple[int, int]]:
+        """Return continuously set grids through (row, column) in direction"""
+        target = self[row, column]
+        if target is None:
+            return set()
+
+        drow, dcolumn = DIRECTIONS[direction]
+        pieces = {(row, column)}
+        for sign in (1, -1):
+            nrow, ncolumn = row + drow * sign, column + dcolumn * sign
+            while 0 <= nrow < self._size and 0 <= ncolumn < self._size:
+                if not self._board[nrow][ncolumn] is target:
+                    break
+                pieces.add((nrow, ncolumn))
+                nrow, ncolumn = nrow + drow * sign, ncolumn + dcolumn * sign
+        return pieces
+
+    def length(self, row: int, column: int, direction: int) -> int:
+        """Return count of continuously set grids through (row, column)"""
+        target = self[row, column]
+        if target is None:
+            return 0
+
+        drow, dcolumn = DIRECTIONS[direction]
+        count = 1
+        for sign in (1, -1):
+            nrow, ncolumn = row + drow * sign, column + dcolumn * sign
+            while 0 <= nrow < self._size and 0 <= ncolumn < self._size:
+                if not self._read(nrow, ncolumn) is target:
+                    break
+                count += 1
+                nrow, ncolumn = nrow + drow * sign, ncolumn + dcolumn * sign
+        return count
+
+    def find(self, row: int, column: int) -> Dict[int, Set[Tuple[int, int]]]:
         """
-        Try to continuously find the specified amount
-        of continuously set data in any direction
+        Find continuously set grids of the same status
+        along the four lines through the specified grid
         Parameters:
             row, column: position or grid
-            paths: path for all directions
             directions:
             1   2   3
               ↖ ↑ ↗
             4 ← · → 4
               ↙ ↓ ↘
             3   2   1
+        Directions without any same neighbour got an empty set.
         """
-        target = self[row, column]
-        if paths is None:
-            paths = {1: set(), 2: set(), 3: set(), 4: set()}
-
-        # Find all grids aorund current one
-        around = self._around(row, column)
-        classified = defaultdict(list)
-        for nrow, ncolumn in around:
-
-            # Filter all invalid grid
-            if not self[nrow, ncolumn] == target:
-                continue
-
-            # Filter non-set grid
-            if self[nrow, ncolumn] == None:
-                continue
-
-            # Define direction
-            if (nrow - row) * (ncolumn - column) == 1:
-                classified[1].append((nrow, ncolumn))
-            if nrow - row == 0:
-                classified[2].append((nrow, ncolumn))
-            if (nrow - row) * (ncolumn - column) == -1:
-                classified[3].append((nrow, ncolumn))
-            if ncolumn - column == 0:
-                classified[4].append((nrow, ncolumn))
-
-        # If direction has not been specified
-        if direction is None:
-            for ndirection, grids in classified.items():
-                for nrow, ncolumn in grids:
-                    paths[ndirection].add((row, column))
-                    paths[ndirection].add((nrow, ncolumn))
-                    self.find(nrow, ncolumn, paths, ndirection)
-
-        # If direction has been sprcified
-        else:
-            grids = classified[direction]
-            for nrow, ncolumn in grids:
-                if (nrow, ncolumn) in paths[direction]:
-                    continue
-                paths[direction].add((nrow, ncolumn))
-                self.find(nrow, ncolumn, paths, direction)
-
-        # If all directional recursions break before condition satisfied
+        paths: Dict[int, Set[Tuple[int, int]]] = dict()
+        for direction in DIRECTIONS:
+            pieces = self.line(row, column, direction)
+            paths[direction] = pieces if len(pieces) > 1 else set()
         return paths
 
     def __setitem__(self, index: Tuple[int, int], value: Union[None, bool]) -> None:
         """Set status for specific index of grid"""
         _x, _y = index
-        if _x > self._size or _x < 0 or _y > self._size or _y < 0:
+        if _x >= self._size or _x < 0 or _y >= self._size or _y < 0:
             raise InvalidGridError(
                 "Invalid index for ({x}, {y})".format(x=_x, y=_y))
 
         # Check for grid if grid has been set
-        if isinstance(self._board[_x][_y], bool) and not value is None:
+        current = self._read(_x, _y)
+        if isinstance(current, bool) and not value is None:
             raise SettedGridError("Cannot set grid which has already been set")
 
-        self._board[_x][_y] = value
-        if value is None:
-            self._records.remove(index)
-        else:
-            self._records.append(index)
+        if not value is None:
+            self.make(_x, _y, value)
+            self._grow(index, value)
+            return
+
+        # Erase the last step with its history, or rebuild history
+        if self._records and self._records[-1] == index:
+            self.unmake()
+            node, self._node = self._node, self._tree[self._node][2]
+            if not self._children[node]:
+                self._children[self._node].remove(node)
+                if node == len(self._tree) - 1:
+                    self._tree.pop()
+                    self._children.pop()
+            return
+        self._records.remove(index)
+        if not current is None:
+            self._hash ^= self._keys[current][_x * self._size + _y]
+        self._write(_x, _y, value)
+        self._plant()
+        for watcher in self._watchers:
+            watcher(_x, _y, value)
 
     def __getitem__(self, index: Tuple[int, int]) -> Union[None, bool]:
         """Return status for specific index of grid"""
         _x, _y = index
-        if _x > self._size or _x < 0 or _y > self._size or _y < 0:
+        if _x >= self._size or _x < 0 or _y >= self._size or _y < 0:
             raise IndexError("Invalid index for ({x}, {y})".format(x=_x, y=_y))
         return self._board[_x][_y]
 
     def show(self) -> None:
         """Show all grids status"""
         status = list()
-        for row in self._board:
-            for column in row:
+        for row in range(self._size):
+            for column in (self._read(row, _y) for _y in range(self._size)):
                 if column is None:
                     status.append('x ')
                 if column is True:
@@ -186,6 +341,71 @@ class Manager:
         print(''.join(status))
 
 
+class Candidates:
+    """
+    Index of unset grids within distance of any set grid
+    Count set grids around every grid, updated on every grid change.
+    """
+
+    def __init__(self, manager: Manager, distance: int = 2) -> None:
+        """
+        Index grids of manager and watch its changes
+        Parameters:
+            distance: max rows or columns away from a set grid
+        """
+        self._manager = manager
+        self._distance = distance
+        self._near: Dict[Tuple[int, int], int] = dict()
+        self._grids: Dict[Tuple[int, int], None] = dict()
+        self.rebuild()
+        manager.watch(self.update)
+
+    def close(self) -> None:
+        """Stop watching manager"""
+        self._manager.unwatch(self.update)
+
+    def rebuild(self) -> None:
+        """Index all set grids from scratch"""
+        self._near.clear()
+        self._grids.clear()
+        for row, column in self._manager.records:
+            self.update(row, column, self._manager[row, column])
+
+    def update(self, row: int, column: int, value: Union[None, bool]) -> None:
+        """Update counts around a changed grid"""
+        if row < 0:
+            self.rebuild()
+            return
+
+        near, grids, manager = self._near, self._grids, self._manager
+        around = manager._around(row, column, self._distance)
+        if value is None:
+            for grid in around:
+                near[grid] -= 1
+                if not near[grid]:
+                    grids.pop(grid, None)
+            if near.get((row, column), 0):
+                grids[(row, column)] = None
+        else:
+            grids.pop((row, column), None)
+            for grid in around:
+                near[grid] = near.get(grid, 0) + 1
+                if manager[grid] is None:
+                    grids[grid] = None
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        """Return all indexed grids"""
+        return iter(self._grids)
+
+    def __len__(self) -> int:
+        """Return indexed grids count"""
+        return len(self._grids)
+
+    def __contains__(self, grid: object) -> bool:
+        """Return if grid is indexed"""
+        return grid in self._grids
+
+
 # Test case
 if __name__ == "__main__":
     size = 10
@@ -229,6 +449,101 @@ if __name__ == "__main__":
         1: {(1, 1), (0, 0)}, 2: {(0, 1), (0, 0)},
         3: set(), 4: set()
     })
+    assert(manager.find(1, 0) == {1: set(), 2: set(), 3: set(), 4: set()})
+
+    # Test find function on a long line without recursion
+    large = Manager(1200)
+    for column in range(1200):
+        large[0, column] = True
+        large[1, column] = False
+    assert(len(large.find(0, 600)[2]) == 1200)
+    assert(large.find(1, 0)[1] == set() and len(large.find(1, 0)[4]) == 0)
 
     # Test show function
     manager.show()
+
+    # Test larger distance of private function _around
+    assert(len(set(manager._around(5, 5, 2))) == 24)
+    assert(set(manager._around(0, 0, 2)) == {
+        (row, column) for row in range(3) for column in range(3)} - {(0, 0)})
+
+    # Test zobrist hash through setitem, rollback, undo and reset
+    position = manager.zobrist
+    manager[5, 5] = False
+    assert(manager.zobrist != position)
+    manager[5, 5] = None
+    assert(manager.zobrist == position)
+    manager[5, 5] = True
+    manager.undo()
+    assert(manager.zobrist == position)
+    other = Manager(size)
+    for row, column in [(0, 1), (1, 1), (3, 0), (0, 0), (2, 2), (1, 0)]:
+        other[row, column] = manager[row, column]
+    assert(other.zobrist == position)
+    other.reset()
+    assert(other.zobrist == 0)
+
+    # Test length against line and find on random grids
+    import random
+    grids = [(row, column) for row in range(size) for column in range(size)]
+    random.seed(size)
+    random.shuffle(grids)
+    manager = Manager(size)
+    for row, column in grids[:60]:
+        manager[row, column] = manager.turn
+        for direction in (1, 2, 3, 4):
+            line = manager.line(row, column, direction)
+            assert(line == (manager.find(row, column)[direction] or {(row, column)}))
+            assert(manager.length(row, column, direction) == len(line))
+
+    # Test candidates index against scanning around all set grids
+    for distance in (1, 2):
+        manager = Manager(size)
+        candidates = Candidates(manager, distance)
+        for row, column in grids[:40]:
+            manager[row, column] = manager.turn
+        for _index in range(10):
+            manager.undo()
+        manager[grids[5]] = None
+        scanned = {grid for record in manager.records
+                   for grid in manager._around(*record, distance)
+                   if manager[grid] is None}
+        assert(set(candidates) == scanned and len(candidates) == len(scanned))
+        manager.reset()
+        assert(not len(candidates))
+        candidates.close()
+
+    # Test make and unmake leave history untouched
+    manager = Manager(size)
+    manager[7, 7] = True
+    manager.make(7, 8, False)
+    assert(manager.steps == 2 and manager[7, 8] is False)
+    assert(manager.unmake() == (7, 8) and manager.variations == ())
+
+    # Test redo and branching variations without copying
+    manager[7, 8] = False
+    manager[6, 6] = True
+    position = manager.zobrist
+    manager.undo()
+    manager.undo()
+    assert(manager.variations == ((7, 8),))
+    manager[8, 8] = False
+    assert(manager.variations == () and manager.undo() == (8, 8))
+    assert(manager.variations == ((7, 8), (8, 8)))
+    assert(manager.redo(0) == (7, 8) and manager.redo() == (6, 6))
+    assert(manager.zobrist == position and manager.records[-1] == (6, 6))
+    manager.undo()
+    manager.undo()
+    assert(manager.variations == ((8, 8), (7, 8)))
+
+    # Erased steps are dropped from history, copies branch independently
+    manager[9, 9] = False
+    manager[9, 9] = None
+    assert(manager.variations == ((8, 8), (7, 8)))
+    copied = manager.copy()
+    copied.redo()
+    copied.undo()
+    copied[1, 1] = False
+    assert(manager.variations == ((8, 8), (7, 8)) and copied.steps == 2)
+    manager.reset()
+    assert(manager.variations == ())
@@ -1,9 +1,20 @@
 """Player model"""
 
 from abc import abstractmethod
-from queue import Queue
-from typing import Tuple, Iterable
-from view import Board
+from queue import Empty, Queue
+from random import Random
+from time import perf_counter
+from typing import Callable, List, Optional, Tuple, Iterable, Union, TYPE_CHECKING
+
+from core.search import Report, Search, legal
+from core.threat import Solver
+
+if TYPE_CHECKING:
+    from book import Book
+    from core.parallel import ParallelSearch
+    from view import Board
+    from model import Manager
+    from rules import Rule
 
 
 class Player:
@@ -17,14 +28,25 @@ class Player:
         """
         self._color = color
         self._name = name
-        self._event: "Queue[Tuple[int, int]]" = Queue(maxsize=1)
+        self._event: "Queue[Optional[Tuple[int, int]]]" = Queue(maxsize=1)
 
     def handler(self, row, column) -> None:
         """Set click event bounding to click function"""
         self._event.put((row, column))
 
+    def leave(self) -> None:
+        """Stop gaming loop waiting for this player"""
+        self._event.put(None)
+
+    def cancel(self) -> None:
+        """Drop event put but not taken yet, like a move found before undo"""
+        try:
+            self._event.get_nowait()
+        except Empty:
+            pass
+
     @property
-    def event(self) -> Tuple[int, int]:
+    def event(self) -> Optional[Tuple[int, int]]:
         """Return event blocking way"""
         return self._event.get()
 
@@ -70,7 +92,7 @@ class Player:
 class LocalPlayer(Player):
     """Player for multiplayer mode"""
 
-    def __init__(self, name: str, color: bool, board: Board) -> None:
+    def __init__(self, name: str, color: bool, board: "Board") -> None:
         super().__init__(name, color)
         self._board = board
 
@@ -95,3 +117,251 @@ class LocalPlayer(Player):
     def announce(self, title: str, msg: str) -> None:
         """Show info in tkinter"""
         self._board.showmsg(title, msg)
+
+
+class HeadlessPlayer(Player):
+    """Player without UI, only records what happened"""
+
+    def __init__(self, name: str, color: bool) -> None:
+        super().__init__(name, color)
+        self.pieces: Optional[Iterable[Tuple[int, int]]] = None
+        self.messages: List[Tuple[str, str]] = list()
+
+    def play(self, row: int, column: int) -> None:
+        """Nothing to draw"""
+
+    def active(self) -> None:
+        """Nothing to activate"""
+
+    def undo(self, row: int, column: int) -> None:
+        """Nothing to undo"""
+
+    def win(self, pieces: Iterable[Tuple[int, int]]) -> None:
+        """Record winning pieces"""
+        self.pieces = pieces
+
+    def announce(self, title: str, msg: str) -> None:
+        """Record announced info"""
+        self.messages.append((title, msg))
+
+
+class RemotePlayer(Player):
+    """
+    Player connected through network
+    Events are awaited in an event loop instead of blocking a thread,
+    messages are lines of text protocol sent by callbacks.
+    """
+
+    def __init__(self, name: str, color: bool,
+                 send: Callable[[str], None],
+                 broadcast: Callable[[str], None]) -> None:
+        """
+        Initialize a remote player:
+            send: send a line to this player only
+            broadcast: send a line to everyone at the same game
+        """
+        import asyncio
+        super().__init__(name, color)
+        self._send = send
+        self._broadcast = broadcast
+        self._events: "asyncio.Queue[Optional[Tuple[int, int]]]" = asyncio.Queue()
+
+    def handler(self, row, column) -> None:
+        """Put position received from network"""
+        self._events.put_nowait((row, column))
+
+    def leave(self) -> None:
+        """Stop gaming coroutine waiting for this player"""
+        self._events.put_nowait(None)
+
+    def cancel(self) -> None:
+        """Drop positions received but not played yet"""
+        import asyncio
+        while True:
+            try:
+                self._events.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+    async def wait(self) -> Optional[Tuple[int, int]]:
+        """Return next event without blocking event loop"""
+        return await self._events.get()
+
+    def send(self, line: str) -> None:
+        """Send a line to this player"""
+        self._send(line)
+
+    def _colorname(self) -> str:
+        """Return color name in protocol"""
+        return "BLACK" if bool(self) else "WHITE"
+
+    def play(self, row: int, column: int) -> None:
+        """Show piece to everyone"""
+        self._broadcast("PLAY {color} {row} {column}".format(
+            color=self._colorname(), row=row, column=column))
+
+    def active(self) -> None:
+        """Tell player to move"""
+        self._send("TURN")
+
+    def undo(self, row: int, column: int) -> None:
+        """Remove piece of everyone"""
+        self._broadcast("UNDO {row} {column}".format(row=row, column=column))
+
+    def win(self, pieces: Iterable[Tuple[int, int]]) -> None:
+        """Show winning pieces to everyone"""
+        self._broadcast("WIN {color} {pieces}".format(
+            color=self._colorname(), pieces=" ".join(
+                "{row},{column}".format(row=row, column=column)
+                for row, column in sorted(pieces))))
+
+    def announce(self, title: str, msg: str) -> None:
+        """Send info to player"""
+        self._send("INFO {title}: {msg}".format(title=title, msg=msg))
+
+
+class AutomatedPlayer(HeadlessPlayer):
+    """Player without UI choosing its own moves when activated"""
+
+    def __init__(self, name: str, color: bool, manager: "Manager",
+                 rule: "Rule") -> None:
+        super().__init__(name, color)
+        self._manager = manager
+        self._rule = rule
+
+    @abstractmethod
+    def choose(self, manager: "Manager",
+               color: bool) -> Optional[Tuple[int, int]]:
+        """Return move of color on a copy of the game, None if no move"""
+        ...
+
+    def active(self) -> None:
+        """Choose and send move as event, leave if no move found"""
+        move = self.choose(self._manager.copy(), bool(self))
+        if move is None:
+            self.leave()
+        else:
+            self.handler(*move)
+
+
+class SearchPlayer(AutomatedPlayer):
+    """Player choosing moves by alpha-beta search"""
+
+    def __init__(self, name: str, color: bool, manager: "Manager",
+                 rule: "Rule", limit: float = 1.0, depth: int = 10,
+                 book: Optional["Book"] = None, workers: int = 1) -> None:
+        """
+        Initialize a search player:
+            manager: game data manager to search on (copied every move)
+            rule: rule of current game
+            limit: hard time limit of every move in seconds
+            depth: maximum search depth
+            book: opening book consulted before searching
+            workers: processes searching together, call close when done
+        """
+        super().__init__(name, color, manager, rule)
+        self._book = book
+        self._limit = limit
+        self._search: Union[Search, "ParallelSearch"]
+        if workers > 1:
+            from core.parallel import ParallelSearch
+            self._search = ParallelSearch(rule, limit, depth, workers=workers)
+        else:
+            self._search = Search(rule, limit, depth)
+
+        # Forcing wins are looked up with a small part of time limit
+        self._solver = Solver(rule, limit=limit / 10)
+
+    @property
+    def report(self) -> Report:
+        """Return depth, nodes and nodes/sec of last move"""
+        return self._search.report
+
+    def close(self) -> None:
+        """Stop worker processes of parallel search"""
+        if not isinstance(self._search, Search):
+            self._search.close()
+
+    def choose(self, manager: "Manager",
+               color: bool) -> Optional[Tuple[int, int]]:
+        """
+        Return move of book, solver or search,
+        they share the time limit of the move
+        """
+        deadline = perf_counter() + self._limit
+        move: Optional[Tuple[int, int]] = None
+        if self._book is not None:
+            move = self._book.probe(manager, self._rule, color)
+        if move is None:
+            line = self._solver(manager, color, min(
+                self._limit / 10, max(deadline - perf_counter(), 0.0)))
+            if line and legal(manager, self._rule, *line[0], color):
+                move = line[0]
+            else:
+                move = self._search(manager, color,
+                                    max(deadline - perf_counter(), 0.0))
+        return move
+
+
+class MCTSPlayer(AutomatedPlayer):
+    """Player choosing moves by Monte Carlo tree search"""
+
+    def __init__(self, name: str, color: bool, manager: "Manager",
+                 rule: "Rule", limit: float = 1.0, playouts: int = 256,
+                 seed: Optional[int] = None,
+                 book: Optional["Book"] = None) -> None:
+        """
+        Initialize a Monte Carlo player:
+            manager: game data manager to search on (copied every move)
+            rule: rule of current game
+            limit: hard time limit of every move in seconds
+            playouts: random games played together in every batch
+            seed: seed of random playouts
+            book: opening book consulted before searching
+        """
+        from core.mcts import MCTS
+        super().__init__(name, color, manager, rule)
+        self._book = book
+        self._search = MCTS(rule, limit, playouts, seed=seed)
+
+    @property
+    def report(self) -> Report:
+        """Return depth, playouts and playouts/sec of last move"""
+        return self._search.report
+
+    def choose(self, manager: "Manager",
+               color: bool) -> Optional[Tuple[int, int]]:
+        """Return move of book or search"""
+        move: Optional[Tuple[int, int]] = None
+        if self._book is not None:
+            move = self._book.probe(manager, self._rule, color)
+        if move is None:
+            move = self._search(manager, color)
+        return move
+
+
+class RandomPlayer(AutomatedPlayer):
+    """Player choosing random legal moves near set grids"""
+
+    def __init__(self, name: str, color: bool, manager: "Manager",
+                 rule: "Rule", seed: Optional[int] = None) -> None:
+        super().__init__(name, color, manager, rule)
+        self._random = Random(seed)
+
+    def choose(self, manager: "Manager",
+               color: bool) -> Optional[Tuple[int, int]]:
+        """Return a random legal move"""
+        size = manager.size
+        near = sorted({grid for record in manager.records
+                       for grid in manager._around(*record)
+                       if manager[grid] is None})
+        rest = [(row, column) for row in range(size)
+                for column in range(size)]
+        self._random.shuffle(near)
+        self._random.shuffle(rest)
+
+        # Prefer grids next to set ones
+        for row, column in near + rest:
+            if legal(manager, self._rule, row, column, color):
+                return row, column
+        return None
@@ -6,3 +6,4 @@ from .pro import Pro
 from .swap import Swap, Swap2
 from .freestyle import FreeStyle
 from .standard import Standard
+from .renju import Renju
@@ -1,20 +1,22 @@
 """Free Style Gomoku Rule"""
 
-from .rule import Rule
+from .rule import Rule, Situation
 from error import GameWon
-from typing import List, Tuple, Dict
+from typing import Tuple
 
 class FreeStyle(Rule):
     """Free Style"""
 
+    OVERLINE = True
+
     def __call__(self, position: Tuple[int, int], step: int,
-                 situation: Dict[int, List[Tuple[int, int]]]) -> None:
+                 situation: Situation) -> None:
         """
         Free style only check wins
         Check the pieces in each direction every click
 
         Free style won if pieces GREATER or EQUAL than 5.
         """
-        for pieces in situation.values():
-            if len(pieces) >= self.VJC:
-                raise GameWon(pieces)
+        pieces = self.won(situation)
+        if pieces:
+            raise GameWon(pieces)
@@ -1,8 +1,8 @@
 """Rule for Gomoku Pro"""
 
-from .rule import Rule
+from .rule import Rule, Situation
 from error import RuleException, InvalidPosition, GameWon
-from typing import List, Tuple, Dict
+from typing import Tuple
 
 
 class Pro(Rule):
@@ -14,8 +14,13 @@ class Pro(Rule):
         if size <= 5:
             raise RuleException("Board too small playing Gomoku Pro")
 
+    @classmethod
+    def create(cls, size: int) -> "Pro":
+        """Gomoku Pro request size of board"""
+        return cls(size)
+
     def __call__(self, position: Tuple[int, int], step: int,
-                 situation: Dict[int, List[Tuple[int, int]]]) -> None:
+                 situation: Situation) -> None:
         """
         Gomoku Pro:
             1. Black must play at centre for first step
@@ -37,6 +42,6 @@ class Pro(Rule):
                                       "Third step must not play at centre 5x5 area")
         
         # Check win like Gomoku Standard
-        for pieces in situation.values():
-            if len(pieces) == self.VJC:
-                raise GameWon(pieces)
+        pieces = self.won(situation)
+        if pieces:
+            raise GameWon(pieces)
@@ -0,0 +1,164 @@
+"""Renju Rule"""
+
+from .rule import Rule, Situation, decode
+from error import GameWon, InvalidPosition
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+from model import DIRECTIONS
+
+
+REACH = 5  # Grids read on each side of a move
+CENTRE = REACH  # Index of the move in line strings
+
+
+class Shape(NamedTuple):
+    """Shape made by the centre piece of a line"""
+    five: bool
+    overline: bool
+    fours: int
+    three: bool
+
+
+def _run(line: str, index: int) -> int:
+    """Return length of continuous "x" pieces through index"""
+    start, end = index, index
+    while start > 0 and line[start - 1] == "x":
+        start -= 1
+    while end < len(line) - 1 and line[end + 1] == "x":
+        end += 1
+    return end - start + 1
+
+
+def _completions(line: str) -> List[int]:
+    """Return unset grids making exactly five through the centre"""
+    return [index for index, char in enumerate(line) if char == "." and
+            _run(line[:index] + "x" + line[index + 1:], CENTRE) == 5]
+
+
+def _straight(completions: List[int]) -> bool:
+    """Return if completions are both ends of an open four"""
+    return len(completions) == 2 and completions[1] - completions[0] == 5
+
+
+@lru_cache(maxsize=None)
+def shape(line: str) -> Shape:
+    """
+    Classify shape of the centre "x" piece of a line string:
+        x - own piece, . - unset grid, o - opponent piece or outside
+    A four can be completed to exactly five, two completions
+    of different fives in the same line count as two fours.
+    A three can be completed to an open four.
+    """
+    run = _run(line, CENTRE)
+    if run >= 5:
+        return Shape(run == 5, run > 5, 0, False)
+
+    completions = _completions(line)
+    if completions:
+        fours = 1 if len(completions) == 1 or _straight(completions) else 2
+        return Shape(False, False, fours, False)
+
+    three = any(
+        _straight(_completions(line[:index] + "x" + line[index + 1:]))
+        for index, char in enumerate(line) if char == ".")
+    return Shape(False, False, 0, three)
+
+
+@lru_cache(maxsize=None)
+def classify(code: int) -> Shape:
+    """Return shape of a line encoded by Situation.code, decoded once"""
+    return shape(decode(code, REACH))
+
+
+class Renju(Rule):
+    """Renju"""
+
+    def winning(self, length: int, color: bool) -> bool:
+        """Black wins by exactly VJC pieces, white also by overline"""
+        if color:
+            return length == self.VJC
+        return length >= self.VJC
+
+    def __call__(self, position: Tuple[int, int], step: int,
+                 situation: Situation) -> None:
+        """
+        Renju:
+            1. Black won if pieces JUST EQUAL to 5
+            2. White won if pieces GREATER or EQUAL than 5
+            3. Otherwise black could not play double three,
+               double four or overline
+        Whether completing grids of threes are forbidden
+        themselves is not checked.
+        """
+        # Lines of black are read once for both lengths and shapes
+        black = step % 2 == 1
+        shapes = [classify(situation.code(direction, REACH))
+                  for direction in DIRECTIONS] if black else []
+        pieces = self.won(situation)
+        if pieces:
+            raise GameWon(pieces)
+        if not black:
+            return
+
+        if any(found.overline for found in shapes):
+            raise InvalidPosition("Overline", "Black could not play overline")
+        if sum(found.fours for found in shapes) >= 2:
+            raise InvalidPosition("Double four",
+                                  "Black could not play double four")
+        if sum(found.three for found in shapes) >= 2:
+            raise InvalidPosition("Double three",
+                                  "Black could not play double three")
+
+
+if __name__ == "__main__":
+
+    from model import Manager
+
+    # Test line shapes
+    assert(shape("ooo.xxxx.oo") == Shape(False, False, 1, False))
+    assert(shape("o.x.xxx.x.o") == Shape(False, False, 2, False))
+    assert(shape("oo..xxx..oo").three)
+    assert(not shape("ooooxxx..oo").three)
+    assert(shape("...xxxxxx..").overline)
+    assert(shape(".x..xxx..x.").fours == 0)
+
+    def play(moves: List[Tuple[int, int]], last: Tuple[int, int]) -> str:
+        """Play moves and return result of black last move"""
+        manager, rule = Manager(15), Renju()
+        for index, grid in enumerate(moves):
+            manager[grid] = index % 2 == 0
+        manager[last] = True
+        try:
+            rule(last, manager.steps, rule.situation(manager, *last))
+        except GameWon:
+            return "won"
+        except InvalidPosition as error:
+            return error.title
+        return "ok"
+
+    # Black double three, double four, overline and five
+    assert(play([(7, 6), (0, 0), (7, 7), (0, 2), (6, 8), (0, 4),
+                 (5, 8), (0, 6)], (7, 8)) == "Double three")
+    assert(play([(7, 5), (0, 0), (7, 6), (0, 2), (7, 7), (0, 4),
+                 (4, 8), (0, 6), (5, 8), (0, 8), (6, 8), (0, 10)],
+                (7, 8)) == "Double four")
+    assert(play([(7, 2), (0, 0), (7, 3), (0, 2), (7, 4), (0, 4),
+                 (7, 6), (0, 6), (7, 7), (0, 8)], (7, 5)) == "Overline")
+    assert(play([(7, 3), (0, 0), (7, 4), (0, 2), (7, 5), (0, 4),
+                 (7, 6), (0, 6), (4, 7), (0, 8), (5, 7), (0, 10),
+                 (6, 7), (0, 12)], (7, 7)) == "won")
+
+    # White wins by overline, black is forbidden
+    rule, manager = Renju(), Manager(15)
+    for column in (2, 3, 4, 6, 7):
+        manager[7, column] = False
+    manager[7, 5] = False
+    assert(rule.won(rule.situation(manager, 7, 5)) == {
+        (7, column) for column in range(2, 8)})
+    assert(rule.five(manager.line(7, 5, 2), False) and
+           not rule.five(manager.line(7, 5, 2), True))
+
+    # Blocked three is allowed
+    assert(play([(7, 5), (0, 0), (7, 6), (7, 8), (5, 7), (0, 4),
+                 (6, 7), (0, 6)], (7, 7)) == "ok")
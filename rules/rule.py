@@ -1,13 +1,160 @@
 """Rule abstract class"""
 
 from abc import abstractmethod
-from typing import List, Set, Tuple, Dict, Type
+from functools import lru_cache
+from typing import (Collection, Dict, Iterator, List, Mapping, Optional,
+                    Set, Tuple, Type, Union, TYPE_CHECKING)
+
+from model import DIRECTIONS
+
+if TYPE_CHECKING:
+    from model import Manager
+
+Window = Tuple[Tuple[Tuple[int, int, int], ...], int]
+
+
+@lru_cache(maxsize=None)
+def _windows(size: int, reach: int) -> Dict[Tuple[int, int, int], Window]:
+    """
+    Return grids within reach on both sides of every direction
+    through every position of a board of size, as (row, column, bit)
+    of grids inside but the position itself and bits of grids outside,
+    bit 0 is the farthest grid on the negative side
+    """
+    windows: Dict[Tuple[int, int, int], Window] = dict()
+    for row in range(size):
+        for column in range(size):
+            for direction, (drow, dcolumn) in DIRECTIONS.items():
+                cells: List[Tuple[int, int, int]] = list()
+                outside = 0
+                for offset in range(reach * 2 + 1):
+                    if offset == reach:
+                        continue
+                    nrow = row + drow * (offset - reach)
+                    ncolumn = column + dcolumn * (offset - reach)
+                    if 0 <= nrow < size and 0 <= ncolumn < size:
+                        cells.append((nrow, ncolumn, 1 << offset))
+                    else:
+                        outside |= 1 << offset
+                windows[row, column, direction] = (tuple(cells), outside)
+    return windows
+
+
+@lru_cache(maxsize=None)
+def _runs(reach: int) -> List[int]:
+    """
+    Return count of continuous own pieces through the centre,
+    indexed by own bits of codes made by Situation.code
+    """
+    width = reach * 2 + 1
+    runs = [0] * (1 << width)
+    for bits in range(len(runs)):
+        start = stop = reach
+        while bits >> stop & 1:
+            stop += 1
+        while start >= 0 and bits >> start & 1:
+            start -= 1
+        runs[bits] = max(stop - start - 1, 0)
+    return runs
+
+
+@lru_cache(maxsize=None)
+def decode(code: int, reach: int = 5) -> str:
+    """Return line string of code made by Situation.code"""
+    width = reach * 2 + 1
+    return "".join("x" if code >> offset & 1 else
+                   "o" if code >> (offset + width) & 1 else "."
+                   for offset in range(width))
+
+
+class Situation(Mapping[int, Set[Tuple[int, int]]]):
+    """
+    Continuously set pieces of every direction through a position,
+    looked up lazily and cached, so rules only pay for what they ask.
+    Valid until the board changes, that is within one move.
+    """
+
+    def __init__(self, manager: "Manager", row: int, column: int) -> None:
+        self._manager, self._row, self._column = manager, row, column
+        self._pieces: Dict[int, Set[Tuple[int, int]]] = dict()
+        self._lengths: Dict[int, int] = dict()
+        self._codes: Dict[Tuple[int, int], int] = dict()
+
+    def __getitem__(self, direction: int) -> Set[Tuple[int, int]]:
+        """Return pieces of direction like Manager.find"""
+        pieces = self._pieces.get(direction)
+        if pieces is None:
+            pieces = self._manager.line(self._row, self._column, direction)
+            self._lengths[direction] = len(pieces)
+            if len(pieces) <= 1:
+                pieces = set()
+            self._pieces[direction] = pieces
+        return pieces
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate all directions"""
+        return iter(DIRECTIONS)
+
+    def __len__(self) -> int:
+        """Return count of directions"""
+        return len(DIRECTIONS)
+
+    @property
+    def color(self) -> Union[None, bool]:
+        """Return color of the piece at the position"""
+        return self._manager._read(self._row, self._column)
+
+    def length(self, direction: int) -> int:
+        """Return count of continuously set pieces without building them"""
+        length = self._lengths.get(direction)
+        if length is None:
+            length = self._manager.length(self._row, self._column, direction)
+            self._lengths[direction] = length
+        return length
+
+    def code(self, direction: int, reach: int = 5) -> int:
+        """
+        Return grids within reach on both sides of direction as integer,
+        bits of own pieces from the negative side, followed by
+        bits of opponent pieces or outside grids.
+        Length of direction is counted too if the line holds it.
+        """
+        code = self._codes.get((direction, reach))
+        if code is None:
+            manager = self._manager
+            read, color = manager._read, self.color
+            cells, blocked = _windows(manager.size, reach)[
+                self._row, self._column, direction]
+            own = 1 << reach
+            for nrow, ncolumn, bit in cells:
+                value = read(nrow, ncolumn)
+                if value is None:
+                    continue
+                if value is color:
+                    own |= bit
+                else:
+                    blocked |= bit
+            code = self._codes[direction, reach] = \
+                own | blocked << (reach * 2 + 1)
+            run = _runs(reach)[own]
+            if run < reach * 2 + 1:
+                self._lengths.setdefault(direction, run)
+        return code
+
+    def line(self, direction: int, reach: int = 5) -> str:
+        """
+        Return grids within reach on both sides of direction:
+            x - piece of the mover, . - unset grid,
+            o - opponent piece or outside
+        """
+        return decode(self.code(direction, reach), reach)
 
 
 class Rule:
     """Abstract Rule class"""
 
     VJC = 5  # Gomoku
+    OVERLINE = False  # If more than VJC pieces also win, for both colors
 
     @abstractmethod
     def __init__(self) -> None:
@@ -27,14 +174,59 @@ class Rule:
         """Return name of rule"""
         return type(self).__name__
 
+    @classmethod
+    def create(cls, size: int) -> "Rule":
+        """Instantiate rule for a board of size"""
+        return cls()
+
+    def situation(self, manager: "Manager", row: int,
+                  column: int) -> Situation:
+        """Return situation of the piece just played checked by this rule"""
+        return Situation(manager, row, column)
+
+    def winning(self, length: int, color: bool) -> bool:
+        """
+        Return if count of continuously set pieces of color
+        wins under this rule
+        """
+        if self.OVERLINE:
+            return length >= self.VJC
+        return length == self.VJC
+
+    def five(self, pieces: Collection[Tuple[int, int]], color: bool) -> bool:
+        """Return if continuously set pieces of color win under this rule"""
+        return self.winning(len(pieces), color)
+
+    def won(self, situation: Mapping[int, Set[Tuple[int, int]]],
+            color: Optional[bool] = None) -> Optional[Set[Tuple[int, int]]]:
+        """
+        Return winning pieces of situation if any,
+        only lengths are counted until a direction wins.
+        Color of pieces is read from a Situation,
+        other mappings like Manager.find need it given.
+        """
+        if not isinstance(situation, Situation):
+            assert color is not None, "color of pieces is required"
+            return next((pieces for pieces in situation.values()
+                         if self.five(pieces, color)), None)
+        color = bool(situation.color)
+        for direction in DIRECTIONS:
+            if self.winning(situation.length(direction), color):
+                return situation[direction]
+        return None
+
     @staticmethod
-    def rules() -> List[Type["Rule"]]:
-        """Return all subclasses of Rule using reflection"""
-        return Rule.__subclasses__()
+    def rules(base: Optional[Type["Rule"]] = None) -> List[Type["Rule"]]:
+        """Return all subclasses of Rule including subclasses of subclasses"""
+        result: List[Type["Rule"]] = list()
+        for rule in (Rule if base is None else base).__subclasses__():
+            result.append(rule)
+            result.extend(Rule.rules(rule))
+        return result
 
     @abstractmethod
     def __call__(self, position: Tuple[int, int], step: int,
-                 situation: Dict[int, Set[Tuple[int, int]]]) -> None:
+                 situation: Situation) -> None:
         """
         The instantiated class needs to support this
         __call__ function so that the upper-level 
@@ -46,7 +238,8 @@ class Rule:
             position: The position of piece of this round
             step: Total step count
             situation: The situation of consecutive pieces 
-                       around the current position.
+                       around the current position, computed lazily
+                       by direction when a rule reads it.
 
         Function does not need to return a value,
         relevant process is determined by the exception thrown:
@@ -60,3 +253,43 @@ class Rule:
             ) - Request swap player this turn
             ...
         """
+
+
+if __name__ == "__main__":
+
+    from model import Manager
+
+    # Test situation is lazy, cached and equal to find
+    manager = Manager(15)
+    for row, column in ((7, 7), (0, 0), (7, 8), (0, 2), (8, 8), (0, 4)):
+        manager[row, column] = manager.turn
+    situation = Situation(manager, 7, 8)
+    assert(not situation._pieces and not situation._lengths)
+    assert(situation.color is True)
+    assert(situation.length(4) == 2 and not situation._pieces)
+    assert(situation[4] is situation[4])
+    assert(dict(situation) == manager.find(7, 8))
+    assert(situation.line(4, 2) == "..xx.")
+    assert(Situation(manager, 0, 2).line(2, 3) == "ox.x.x.")
+    assert(Situation(manager, 0, 2).line(3, 3) == "ooox..o")
+    for row, column in ((7, 7), (0, 0), (7, 8), (0, 4), (8, 8)):
+        for direction in DIRECTIONS:
+            situation = Situation(manager, row, column)
+            assert(decode(situation.code(direction)) ==
+                   Situation(manager, row, column).line(direction))
+            assert(situation.length(direction) ==
+                   manager.length(row, column, direction))
+
+    # Test lengths decide wins before any pieces built
+    for column in range(5):
+        manager[3, column] = True
+    situation = Situation(manager, 3, 2)
+    assert(Rule().won(situation) == {(3, column) for column in range(5)})
+    assert(list(situation._pieces) == [2])
+    assert(Rule().won(manager.find(3, 2), True) == situation[2])
+
+    # Test all rules are found including subclasses of subclasses,
+    # through the package since this module runs as __main__
+    import rules
+    assert({rules.Standard, rules.Swap, rules.Swap2} <=
+           set(rules.Rule.rules()))
@@ -1,16 +1,18 @@
 """Swap and Swap2 Rules"""
 
 
-from player import Player
 from error import GameWon, RuleException, SwapRequest
-from .rule import Rule
-from typing import List, Tuple, Dict
+from .rule import Rule, Situation
+from typing import Tuple, Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from player import Player
 
 
 class Swap(Rule):
     """Swap Rule"""
 
-    def swapping(self, players: Dict[bool, Player]) -> bool:
+    def swapping(self, players: Dict[bool, "Player"]) -> bool:
         """Swap players"""
         black, white = players[True], players[False]
 
@@ -25,7 +27,7 @@ class Swap(Rule):
         return True
 
     def __call__(self, position: Tuple[int, int], step: int,
-                 situation: Dict[int, List[Tuple[int, int]]]) -> None:
+                 situation: Situation) -> None:
         """
         Swap Rule:
             After third piece has been played, 
@@ -42,9 +44,9 @@ class Swap(Rule):
             raise request
 
         # Check winning
-        for pieces in situation.values():
-            if len(pieces) == self.VJC:
-                raise GameWon(pieces)
+        pieces = self.won(situation)
+        if pieces:
+            raise GameWon(pieces)
 
 
 class Swap2(Swap):
@@ -54,13 +56,13 @@ class Swap2(Swap):
         """Initialize Swapped flag to False"""
         self._swapped = False
 
-    def swapping(self, players: Dict[bool, Player]) -> bool:
+    def swapping(self, players: Dict[bool, "Player"]) -> bool:
         """After swapped set flag"""
         self._swapped = True
         return super().swapping(players)
 
     def __call__(self, position: Tuple[int, int], step: int,
-                 situation: Dict[int, List[Tuple[int, int]]]) -> None:
+                 situation: Situation) -> None:
         """
         Swap Rule:
             After third piece has been played, 
@@ -89,6 +91,6 @@ class Swap2(Swap):
             raise request
 
         # Check winning
-        for pieces in situation.values():
-            if len(pieces) == self.VJC:
-                raise GameWon(pieces)
+        pieces = self.won(situation)
+        if pieces:
+            raise GameWon(pieces)
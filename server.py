@@ -0,0 +1,310 @@
+"""
+Network game server
+Host many games in one asyncio event loop over a line protocol.
+Client sends:
+    HELLO <name> - wait for an opponent
+    MOVE <row> <column> - play a piece at own turn
+    CHOOSE <index> - choose option of a swap request
+    QUIT - leave game
+Server sends:
+    WAIT, START <color> <opponent> <rule> <size>, TURN,
+    PLAY <color> <row> <column>, UNDO <row> <column>,
+    WIN <color> <row>,<column> ..., SWAP <option>|<option>...,
+    COLOR <color>, INFO <title>: <msg>, ERROR <msg>, END
+"""
+
+import asyncio
+from functools import partial
+from typing import Callable, Dict, List, Optional, Set, Tuple, Type
+
+from rules import Rule
+from controller import Game, Outcome
+from player import Player, RemotePlayer
+from error import SwapRequest
+
+
+def _write(writer: asyncio.StreamWriter, line: str) -> None:
+    """Write a line to connection without waiting"""
+    if not writer.is_closing():
+        writer.write((line + "\n").encode())
+
+
+async def _drain(writer: asyncio.StreamWriter) -> None:
+    """Wait until lines written to connection are sent, if still open"""
+    try:
+        await writer.drain()
+    except ConnectionError:
+        pass
+
+
+def _colorname(color: bool) -> str:
+    """Return color name in protocol"""
+    return "BLACK" if color else "WHITE"
+
+
+class RemoteGame(Game):
+    """Game between remote players driven by a coroutine"""
+
+    def __init__(self, grids: int,
+                 seats: Dict[bool, Tuple[str, asyncio.StreamWriter]],
+                 rule: Rule) -> None:
+        """Initialize a new game with name and connection of every color"""
+        super().__init__(grids, 0, {color: name for color, (name, _writer)
+                                    in seats.items()}, rule)
+        self._writers = [writer for _name, writer in seats.values()]
+        self._request: Optional[Tuple[SwapRequest, Dict[bool, Callable]]] = None
+        self.over = False
+        for color, (name, writer) in seats.items():
+            self._players[color] = RemotePlayer(
+                name, color, partial(_write, writer), self.broadcast)
+
+    def seated(self, color: bool) -> RemotePlayer:
+        """Return player of color"""
+        return self._players[color]  # type: ignore
+
+    def broadcast(self, line: str) -> None:
+        """Send a line to all connections of this game"""
+        for writer in self._writers:
+            _write(writer, line)
+
+    async def drain(self) -> None:
+        """Wait until lines sent to all connections of this game are sent"""
+        await asyncio.gather(*(_drain(writer) for writer in self._writers))
+
+    def swap(self, request: SwapRequest, callbacks: Dict[bool, Callable]) -> None:
+        """Ask opponent of current player to choose a swap option"""
+        self._request = request, callbacks
+        chooser = self.seated(not bool(self.player))
+        chooser.send("SWAP " + "|".join(" ".join(key) for key in request.options))
+
+    def choose(self, player: RemotePlayer, index: int) -> bool:
+        """Apply swap option chosen by player, return if accepted"""
+        if self._request is None or player is self.player:
+            return False
+        request, callbacks = self._request
+        keys = list(request.options)
+        if not 0 <= index < len(keys):
+            return False
+        self._request = None
+
+        previous = self.player
+        callback = callbacks.get(request.options[keys[index]](self._players))
+        for color in (True, False):
+            self.seated(color).send("COLOR " + _colorname(color))
+        if callable(callback):
+            callback()
+        if self.player is not previous:
+            self._wake(previous)
+        return True
+
+    def _wake(self, player: Player) -> None:
+        """Wake coroutine waiting for events of player"""
+        player.handler(-1, -1)
+
+    def start(self) -> None:
+        """Bind sente player"""
+        self._curplayer = self._players[True]
+        self.player.active()
+
+    async def serve(self) -> None:
+        """
+        Play events of current player until game ends or someone leaves,
+        a slow connection holds the game until its lines are sent
+        """
+        self.start()
+        try:
+            while True:
+                await self.drain()
+                player = self.seated(bool(self.player))
+                position = await player.wait()
+                if position is None:
+                    break
+
+                # Player woken by losing the turn has nothing to play
+                if player is not self.player:
+                    continue
+                if self._request is not None:
+                    player.send("ERROR Waiting for swap")
+                    continue
+                outcome = self.submit_move(*position)
+                if outcome is Outcome.INVALID:
+                    player.send("ERROR Invalid move")
+                    player.active()
+                elif outcome.over:
+                    break
+        finally:
+            self.over = True
+            self.broadcast("END")
+
+
+class Server:
+    """Pair connected players and host their games"""
+
+    def __init__(self, rule: Type[Rule], grids: int = 15) -> None:
+        """
+        Initialize a server:
+            rule: rule type of all games
+            grids: board size of all games
+        """
+        self._rule, self._grids = rule, grids
+        self._waiting: Optional[Tuple[
+            str, asyncio.StreamWriter,
+            "asyncio.Future[Tuple[RemoteGame, RemotePlayer]]"]] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.games: Set[RemoteGame] = set()
+
+    async def _pair(self, name: str, writer: asyncio.StreamWriter
+                    ) -> Tuple[RemoteGame, RemotePlayer]:
+        """Wait for an opponent, return game and player of connection"""
+        waiting = self._waiting
+        if waiting is None or waiting[1].is_closing():
+            future: "asyncio.Future[Tuple[RemoteGame, RemotePlayer]]" = \
+                asyncio.get_running_loop().create_future()
+            self._waiting = name, writer, future
+            _write(writer, "WAIT")
+            return await future
+
+        self._waiting = None
+        opponent, owriter, future = waiting
+        game = RemoteGame(self._grids, {True: (opponent, owriter),
+                                        False: (name, writer)},
+                          self._rule.create(self._grids))
+        for color, (player, other) in ((True, (opponent, name)),
+                                       (False, (name, opponent))):
+            game.seated(color).send("START {color} {other} {rule} {size}".format(
+                color=_colorname(color), other=other,
+                rule=str(game.rule), size=self._grids))
+        self.games.add(game)
+        task = asyncio.create_task(game.serve())
+        self._tasks.add(task)
+        task.add_done_callback(lambda done: self._close(game, done))
+        future.set_result((game, game.seated(True)))
+        return game, game.seated(False)
+
+    def _close(self, game: RemoteGame, task: "asyncio.Task[None]") -> None:
+        """Forget finished game"""
+        self.games.discard(game)
+        self._tasks.discard(task)
+
+    def _dispatch(self, game: RemoteGame, player: RemotePlayer,
+                  words: List[str]) -> bool:
+        """Handle a command of player, return if connection goes on"""
+        command, arguments = (words[0].upper(), words[1:]) if words else ("", [])
+        if command == "QUIT":
+            return False
+        if game.over:
+            player.send("ERROR Game over")
+        elif command == "MOVE" and len(arguments) == 2 and \
+                all(argument.isdigit() for argument in arguments):
+            if game.player is not player:
+                player.send("ERROR Not your turn")
+            else:
+                player.handler(int(arguments[0]), int(arguments[1]))
+        elif command == "CHOOSE" and len(arguments) == 1 and \
+                arguments[0].isdigit():
+            if not game.choose(player, int(arguments[0])):
+                player.send("ERROR Nothing to choose")
+        else:
+            player.send("ERROR Unknown command")
+        return True
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """Serve one connection"""
+        player: Optional[RemotePlayer] = None
+        try:
+            words = (await reader.readline()).decode().split()
+            if len(words) != 2 or words[0].upper() != "HELLO":
+                _write(writer, "ERROR Say HELLO <name> first")
+                return
+            game, player = await self._pair(words[1], writer)
+            async for line in reader:
+                if not self._dispatch(game, player, line.decode().split()):
+                    break
+                await writer.drain()
+        except (ConnectionError, UnicodeDecodeError):
+            pass
+        finally:
+            if player is not None:
+                player.leave()
+            writer.close()
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        """Start listening"""
+        return await asyncio.start_server(self.handle, host, port)
+
+
+def run(host: str, port: int, rule: Type[Rule], grids: int = 15) -> None:
+    """Serve games until interrupted"""
+    async def forever() -> None:
+        listener = await Server(rule, grids).start(host, port)
+        async with listener:
+            await listener.serve_forever()
+    asyncio.run(forever())
+
+
+if __name__ == "__main__":
+
+    from rules import Standard, Swap
+
+    async def client(port: int, name: str,
+                     first: Optional[Tuple[int, int]] = None) -> List[str]:
+        """
+        Play a line of moves by color at every turn, quit when no move left,
+        first move is tried before the line if given,
+        return all received lines
+        """
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write("HELLO {name}\n".format(name=name).encode())
+        received: List[str] = list()
+        moves: List[Tuple[int, int]] = list()
+        async for line in reader:
+            received.append(line.decode().strip())
+            if received[-1].startswith("START"):
+                row = 7 if received[-1].split()[1] == "BLACK" else 8
+                moves = [(row, column) for column in range(5)]
+                if first is not None:
+                    moves.insert(0, first)
+            elif received[-1] == "TURN":
+                writer.write("MOVE {0} {1}\n".format(*moves.pop(0)).encode()
+                             if moves else b"QUIT\n")
+            elif received[-1].startswith("SWAP"):
+                writer.write(b"CHOOSE 0\n")
+            elif received[-1] == "END":
+                writer.write(b"QUIT\n")
+        writer.close()
+        return received
+
+    async def test(rule: Type[Rule], count: int,
+                   first: Optional[Tuple[int, int]] = None) -> List[List[str]]:
+        """Play count games concurrently"""
+        server = Server(rule)
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        results = await asyncio.gather(*(
+            client(port, "P{index}".format(index=index), first)
+            for index in range(count * 2)))
+        listener.close()
+        await listener.wait_closed()
+        assert(not server.games)
+        return results
+
+    # Test many concurrent games in one event loop
+    results = asyncio.run(test(Standard, 200))
+    assert(sum(lines[0] == "WAIT" for lines in results) == 200)
+    for lines in results:
+        assert(lines[-2:] == ["WIN BLACK 7,0 7,1 7,2 7,3 7,4", "END"])
+
+    # Test occupied grids are refused and asked again,
+    # black plays (7, 0) twice and white plays it after black
+    for lines in asyncio.run(test(Standard, 10, (7, 0))):
+        index = lines.index("ERROR Invalid move")
+        assert(lines[index + 1] == "TURN")
+        assert(lines[-2:] == ["WIN BLACK 7,0 7,1 7,2 7,3 7,4", "END"])
+
+    # Test swap is asked to white and taking black swaps colors
+    black, white = sorted(asyncio.run(test(Swap, 1)),
+                          key=lambda lines: "START WHITE" in " ".join(lines))
+    assert(any(line.startswith("SWAP") for line in white))
+    assert("COLOR WHITE" in black and "COLOR BLACK" in white)
+    assert(black[-1] == "TURN" and white[-1] == "END")  # Black quit
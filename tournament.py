@@ -0,0 +1,276 @@
+"""
+Self-play tournament
+Play games between automated players under every rule
+across worker processes, and summarize results with Elo ratings.
+"""
+
+from argparse import ArgumentParser
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from itertools import combinations
+from random import Random
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Type
+
+from rules import Rule
+from archive import Writer
+from book import Book
+from controller import Game, HeadlessGame, Outcome
+from player import MCTSPlayer, Player, RandomPlayer, SearchPlayer
+
+
+class Entrant(NamedTuple):
+    """
+    Tournament player:
+        name: unique player name
+        factory: make player with (name, color, game, seed),
+                 must be picklable
+    """
+    name: str
+    factory: Callable[[str, bool, Game, int], Player]
+
+
+class Result(NamedTuple):
+    """Result of one game"""
+    rule: str
+    black: str
+    white: str
+    winner: Optional[str]  # None for draw
+    moves: Tuple[Tuple[int, int], ...]
+    times: Tuple[float, ...]  # Seconds spent by every move
+
+
+@lru_cache(maxsize=None)
+def _book(path: str) -> Book:
+    """
+    Return book of path mapped once by every process,
+    shared by all games played in it
+    """
+    return Book(path)
+
+
+def _searcher(name: str, color: bool, game: Game, _seed: int,
+              limit: float, depth: int, book: Optional[str]) -> Player:
+    """Make a SearchPlayer for game, using book file if given"""
+    return SearchPlayer(name, color, game.manager, game.rule, limit, depth,
+                        None if book is None else _book(book))
+
+
+def _mcts(name: str, color: bool, game: Game, seed: int, limit: float,
+          playouts: int, book: Optional[str]) -> Player:
+    """Make a MCTSPlayer for game, using book file if given"""
+    return MCTSPlayer(name, color, game.manager, game.rule, limit, playouts,
+                      seed, None if book is None else _book(book))
+
+
+def _random(name: str, color: bool, game: Game, seed: int) -> Player:
+    """Make a RandomPlayer for game"""
+    return RandomPlayer(name, color, game.manager, game.rule, seed)
+
+
+def searcher(name: str, limit: float = 0.1, depth: int = 10,
+             book: Optional[str] = None) -> Entrant:
+    """Return entrant using alpha-beta search and opening book file"""
+    return Entrant(name, partial(_searcher, limit=limit, depth=depth,
+                                 book=book))
+
+
+def montecarlo(name: str, limit: float = 0.1, playouts: int = 256,
+               book: Optional[str] = None) -> Entrant:
+    """Return entrant using Monte Carlo tree search and opening book file"""
+    return Entrant(name, partial(_mcts, limit=limit, playouts=playouts,
+                                 book=book))
+
+
+def randomer(name: str) -> Entrant:
+    """Return entrant playing random moves"""
+    return Entrant(name, _random)
+
+
+def opening(game: Game, seed: int, plies: int = 2, reach: int = 2) -> None:
+    """
+    Play plies random legal moves within reach of centre,
+    the same moves for the same seed
+    """
+    generator, centre = Random(seed), game.manager.size // 2
+    grids = [(row, column)
+             for row in range(centre - reach, centre + reach + 1)
+             for column in range(centre - reach, centre + reach + 1)]
+    for _ply in range(plies):
+        generator.shuffle(grids)
+        for grid in grids:
+            outcome = game.submit_move(*grid)
+            if outcome is not Outcome.INVALID:
+                break
+        if outcome is not Outcome.PLAYED:
+            return
+
+
+def play(rule: Type[Rule], grids: int, black: Entrant, white: Entrant,
+         index: int = 0, plies: int = 2) -> Result:
+    """
+    Play one game until won or no move left, after a random opening
+    of plies moves seeded by index, players are also seeded by index
+    """
+    game = HeadlessGame(grids, {True: black.name, False: white.name},
+                        rule.create(grids))
+    opening(game, index, plies)
+    for color, entrant in ((True, black), (False, white)):
+        game.join(entrant.factory(entrant.name, color, game,
+                                  index * 2 + int(color)))
+
+    # Every step also activates next player to think its move
+    start = perf_counter()
+    game.player.active()
+    times: List[float] = [perf_counter() - start]
+    winner: Optional[str] = None
+    for _index in range(grids * grids * 2):
+        position = game.player.event
+        if position is None:
+            break
+        start = perf_counter()
+        outcome = game.submit_move(*position)
+        if outcome is Outcome.WON:
+            winner = str(game.player)
+            break
+
+        # Invalid move is not asked again, the player forfeits
+        if outcome is Outcome.INVALID:
+            winner = white.name if str(game.player) == black.name else black.name
+            break
+        if outcome.over:
+            break
+        times.append(perf_counter() - start)
+
+    return Result(str(game.rule), black.name, white.name, winner,
+                  game.manager.records, tuple(times))
+
+
+def elo(results: Iterable[Result], rounds: int = 500,
+        bound: float = 1600.0) -> Dict[str, float]:
+    """
+    Estimate Elo ratings from results by fitting expected scores
+    to actual scores, ratings are relative with average 0 and are
+    bounded for players who won or lost all games
+    """
+    games: List[Tuple[str, str, float]] = list()
+    played: Dict[str, int] = defaultdict(int)
+    for result in results:
+        score = 0.5 if result.winner is None else \
+            float(result.winner == result.black)
+        games.append((result.black, result.white, score))
+        played[result.black] += 1
+        played[result.white] += 1
+
+    ratings = {name: 0.0 for name in played}
+    for _round in range(rounds):
+        errors: Dict[str, float] = defaultdict(float)
+        for black, white, score in games:
+            expected = 1 / (1 + 10 ** ((ratings[white] - ratings[black]) / 400))
+            errors[black] += score - expected
+            errors[white] -= score - expected
+        for name in ratings:
+            ratings[name] += 200 * errors[name] / played[name]
+        average = sum(ratings.values()) / len(ratings)
+        for name in ratings:
+            ratings[name] = min(max(ratings[name] - average, -bound), bound)
+    return ratings
+
+
+class Summary:
+    """Tournament results summary"""
+
+    def __init__(self, results: List[Result]) -> None:
+        self.results = results
+        self.ratings = elo(results)
+
+    def table(self) -> str:
+        """Return summary lines of all rules and players"""
+        lines: List[str] = list()
+        byrule: Dict[str, List[Result]] = defaultdict(list)
+        for result in self.results:
+            byrule[result.rule].append(result)
+
+        for rule, results in sorted(byrule.items()):
+            steps = [len(result.moves) for result in results]
+            times = [time for result in results for time in result.times]
+            lines.append("{rule}: {games} games, {steps:.1f} moves/game, "
+                         "{mean:.4f}s/move (max {max:.4f}s)".format(
+                             rule=rule, games=len(results),
+                             steps=sum(steps) / len(steps),
+                             mean=sum(times) / max(len(times), 1),
+                             max=max(times, default=0.0)))
+
+        for name, rating in sorted(self.ratings.items(), key=lambda item: -item[1]):
+            wins = sum(result.winner == name for result in self.results)
+            played = sum(name in (result.black, result.white)
+                         for result in self.results)
+            draws = sum(result.winner is None and
+                        name in (result.black, result.white)
+                        for result in self.results)
+            lines.append("{name}: Elo {rating:+.0f}, {wins}W {draws}D {losses}L".format(
+                name=name, rating=rating, wins=wins, draws=draws,
+                losses=played - wins - draws))
+        return "\n".join(lines)
+
+
+def tournament(entrants: List[Entrant], games: int, grids: int = 15,
+               rules: Optional[List[Type[Rule]]] = None,
+               workers: Optional[int] = None,
+               archive: Optional[str] = None) -> Summary:
+    """
+    Play games between every pair of entrants under every rule,
+    colors are swapped every game and both colors of a pair play the
+    same random opening, games are spread across processes.
+    All games are appended to archive file if given.
+    """
+    if rules is None:
+        rules = Rule.rules()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = list()
+        for rule in rules:
+            for first, second in combinations(entrants, 2):
+                for index in range(games):
+                    black, white = (first, second) if index % 2 == 0 \
+                        else (second, first)
+                    futures.append(executor.submit(
+                        play, rule, grids, black, white, index // 2))
+        results = [future.result() for future in futures]
+
+    if archive is not None:
+        with Writer(archive) as writer:
+            for result in results:
+                winner = None if result.winner is None else \
+                    len(result.moves) % 2 == 1
+                writer.write(result.rule, grids, result.moves, winner)
+    return Summary(results)
+
+
+if __name__ == "__main__":
+
+    parser = ArgumentParser(description="Gomoku self-play tournament")
+    parser.add_argument("--games", type=int, default=10,
+                        help="games of every pair under every rule")
+    parser.add_argument("--grids", type=int, default=15)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--limit", type=float, default=0.1,
+                        help="seconds limit of every searched move")
+    parser.add_argument("--archive", default=None,
+                        help="append all games to this archive file")
+    parser.add_argument("--book", default=None,
+                        help="opening book file of searching players")
+    parser.add_argument("--mcts", action="store_true",
+                        help="also enter a Monte Carlo tree search player")
+    arguments = parser.parse_args()
+
+    entrants = [searcher("Search", arguments.limit, book=arguments.book),
+                randomer("Random")]
+    if arguments.mcts:
+        entrants.append(montecarlo("MCTS", arguments.limit,
+                                   book=arguments.book))
+    summary = tournament(entrants, arguments.games, arguments.grids,
+                         workers=arguments.workers,
+                         archive=arguments.archive)
+    print(summary.table())
@@ -42,10 +42,15 @@ class Board:
     WHINT = ViewSettings.WHINT  # White hinter
 
     LOCATINGR = 5  # Radius of location point
+    FRAME = 16  # Milliseconds between hint updates
     OUTLINEMARG = 3  # Pixels margin of outline
 
     SELECT_PANEL_BGC = "#ECECEC"  # Default selection panel background color
 
+    # Canvas tags of items drawn once and of pieces
+    GRIDTAG = "grid"
+    PIECETAG = "piece"
+
     def __init__(self, root: tkinter.Tk, size: int, grids: int) -> None:
         """
         Instantiate a new game board object.
@@ -88,6 +93,14 @@ class Board:
             0, 0, -piece * 2, -piece * 2,
             fill=self.BHINT, outline="")
 
+        # Grid index of every pixel on both axes, -1 for outside,
+        # hint follows latest pointer position once a frame
+        self._cells = [self._locate(pixel)
+                       for pixel in range(self._size + self.PADDING * 2 + 1)]
+        self._pointer = 0, 0
+        self._hovered = -1, -1
+        self._pending: Optional[str] = None
+
         # Bind left key and moving
         self._board.bind("<Button-1>", self._click)
         self._board.bind("<Motion>", self._moving)
@@ -95,7 +108,7 @@ class Board:
         # Handle left key function
         self._click_handler = None
         self._restart_handler = None
-        self._undo_handler: Optional[Callable[[], Tuple[int, int]]] = None
+        self._undo_handler: Optional[Callable[[], object]] = None
 
         # Initial menubar
         menubar = tkinter.Menu(self._root)
@@ -125,6 +138,7 @@ class Board:
 
         # Record pieces
         self._pieces: OrderedDict[Tuple[int, int], int] = odict()
+        self._drawn = False
 
     @staticmethod
     def _help() -> None:
@@ -179,24 +193,33 @@ class Board:
         self._restart_handler = func
 
     @property
-    def fundo(self) -> Optional[Callable[[], Tuple[int, int]]]:
+    def fundo(self) -> Optional[Callable[[], object]]:
         """Return undo handler"""
         return self._undo_handler
 
     @fundo.setter
-    def fundo(self, func: Optional[Callable[[], Tuple[int, int]]]) -> None:
+    def fundo(self, func: Optional[Callable[[], object]]) -> None:
         """Set undo handler"""
         self._undo_handler = func
 
+    def _locate(self, pixel: int) -> int:
+        """Return grid index nearest to pixel, -1 if outside"""
+        pixel -= self.PADDING
+        if pixel < 0:
+            return -1
+        index = (pixel - self._unit // 2) // self._unit + 1
+        return index if index <= self._grids - 1 else -1
+
+    def _cell(self, _x: int, _y: int) -> Tuple[int, int]:
+        """Return (row, column) of pixels, -1 if outside"""
+        if not (0 <= _x < len(self._cells) and 0 <= _y < len(self._cells)):
+            return -1, -1
+        return self._cells[_x], self._cells[_y]
+
     def _click(self, position: tkinter.Event) -> None:
         """Handle for left key click event"""
-        _x, _y = position.x - self.PADDING, position.y - self.PADDING
-        if _x < 0 or _y < 0:
-            return
-        _x -= self._unit // 2
-        _y -= self._unit // 2
-        row, column = _x // self._unit + 1, _y // self._unit + 1
-        if row > self._grids - 1 or column > self._grids - 1:
+        row, column = self._cell(position.x, position.y)
+        if row < 0 or column < 0:
             return
 
         # Send row and column data to handler
@@ -214,27 +237,43 @@ class Board:
         hintcolor = self.BHINT if color else self.WHINT
         self._board.itemconfig(target, fill=hintcolor)
 
+    def clear(self) -> None:
+        """Remove all pieces, grids are kept"""
+        self._board.delete(self.PIECETAG)
+        self._pieces.clear()
+
     def _restart(self) -> None:
         """Restart game"""
         if msgbox.askyesno("Confirm", "Do you really want restart this game?"):
-            self._board.destroy()
-
-            # Retstart handlers and board view
-            handlers = self._restart_handler, self._click_handler, self._undo_handler
-            self.__init__(self._root, self._size, self._grids)
-            self._restart_handler, self._click_handler, self._undo_handler = handlers
-            self.draw()
-
+            self.clear()
             if not self._restart_handler is None:
                 self._restart_handler()
 
     def _moving(self, position: tkinter.Event) -> None:
-        """Handle moving event"""
-        target = self._hinter
-        xa, ya, xb, yb = self._board.coords(target)
-        nx, ny = (xa + xb) / 2, (ya + yb) / 2
-        dx, dy = position.x - nx, position.y - ny
-        self._board.move(target, dx, dy)
+        """Handle moving event, coalesce events into one update a frame"""
+        self._pointer = position.x, position.y
+        if self._pending is None:
+            self._pending = self._root.after(self.FRAME, self._hover)
+
+    def _hover(self) -> None:
+        """Snap hint to grid under pointer if grid changed"""
+        self._pending = None
+        row, column = self._cell(*self._pointer)
+        if row < 0 or column < 0:
+            row, column = -1, -1
+        if (row, column) == self._hovered:
+            return
+        self._hovered = row, column
+
+        # Hide hint outside board
+        radius = int(self._unit / 3.0)
+        if row < 0:
+            self._board.coords(self._hinter, 0, 0, -radius * 2, -radius * 2)
+            return
+        _x = row * self._unit + self.PADDING
+        _y = column * self._unit + self.PADDING
+        self._board.coords(self._hinter, _x - radius, _y - radius,
+                           _x + radius, _y + radius)
 
     def _undo(self) -> None:
         """Undo the last step"""
@@ -242,8 +281,7 @@ class Board:
             return
         if not self._undo_handler or not self._pieces:
             return
-        x, y = self._undo_handler()
-        self.undo(x, y)
+        self._undo_handler()  # Removed piece is drawn by player undo
 
     def _exit(self) -> None:
         """Destory window and exit game"""
@@ -265,7 +303,8 @@ class Board:
         # Create canvas oval
         if (row, column) in self._pieces:
             return
-        piece = self._board.create_oval(*position, fill=fillcolor, outline="")
+        piece = self._board.create_oval(*position, fill=fillcolor, outline="",
+                                        tags=self.PIECETAG)
         self._pieces[(row, column)] = piece
 
     def undo(self, row: int, column: int) -> None:
@@ -276,17 +315,25 @@ class Board:
             self._board.delete(piece)
 
     def draw(self) -> None:
-        """Draw vertical and horizontal lines as the game board"""
+        """
+        Draw vertical and horizontal lines as the game board,
+        only the first call draws, items are kept below pieces
+        """
+        if self._drawn:
+            return
+        self._drawn = True
+        tags = self.GRIDTAG
+
         for index in range(self._grids):
             # Draw horizontal
             startx = self.PADDING, self.PADDING + self._unit * index
             endx = self.PADDING + self._size, self.PADDING + self._unit * index
-            self._board.create_line(*startx, *endx)
+            self._board.create_line(*startx, *endx, tags=tags)
 
             # Draw vertical
             starty = self.PADDING + index * self._unit, self.PADDING
             endy = self.PADDING + index * self._unit, self.PADDING + self._size
-            self._board.create_line(*starty, *endy)
+            self._board.create_line(*starty, *endy, tags=tags)
 
         # Draw locating point
         for row, column in {
@@ -297,14 +344,15 @@ class Board:
             _y = column * self._unit + self.PADDING
             positions = _x - self.LOCATINGR, _y - self.LOCATINGR, \
                 _x + self.LOCATINGR, _y + self.LOCATINGR
-            self._board.create_oval(*positions, fill=self.BLACK)
+            self._board.create_oval(*positions, fill=self.BLACK, tags=tags)
 
         # Draw outline
         self._board.create_rectangle(
             self.PADDING - self.OUTLINEMARG,
             self.PADDING - self.OUTLINEMARG,
             self._size + self.PADDING + self.OUTLINEMARG,
-            self._size + self.PADDING + self.OUTLINEMARG)
+            self._size + self.PADDING + self.OUTLINEMARG, tags=tags)
+        self._board.tag_lower(tags)
 
     def selpanel(self, title: str, labels: Tuple[str, ...],
                  options: Dict[Tuple[str, ...], Callable],